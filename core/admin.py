@@ -1,8 +1,8 @@
-
 from django.contrib import admin
-from .models import Customer, CreditApplication, Transaction, Loan
+from .models import Customer, CreditApplication, Transaction, Loan, IngestionCheckpoint
 
 admin.site.register(Customer)
 admin.site.register(CreditApplication)
 admin.site.register(Transaction)
 admin.site.register(Loan)
+admin.site.register(IngestionCheckpoint)
@@ -0,0 +1,76 @@
+"""Vectorised amortization schedules for one loan or a whole book of loans."""
+import csv
+from itertools import islice
+
+import numpy as np
+from django.utils import timezone
+
+from .models import Loan
+from .scoring import calculate_emi
+
+SCHEDULE_COLUMNS = ['payment', 'principal', 'interest', 'balance']
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def _cents(values):
+    return np.rint(np.asarray(values, dtype='float64') * 100).astype('int64')
+
+
+def amortization_schedules(principals, rates, tenures, installments=None):
+    """Schedules for many loans at once, worked in whole cents.
+
+    Returns ``(installments, schedule)`` where ``schedule`` maps each of
+    SCHEDULE_COLUMNS to a (loans, max tenure) array, NaN past a loan's tenure.
+    ``installments`` are the loans' stored monthly payments, or ``calculate_emi``
+    values when not given. Each month's interest is rounded to the cent and the
+    rest of the installment repays principal; the last payment absorbs the
+    residual, so principal sums to the loan amount and every balance ends at zero.
+    """
+    tenure = np.asarray(tenures, dtype='int64')
+    if installments is None:
+        installments = [calculate_emi(p, r, n) if n > 0 else 0.0 for p, r, n in zip(principals, rates, tenure.tolist())]
+    installment = _cents(installments)
+    rate = np.asarray(rates, dtype='float64') / 12 / 100
+    balance = _cents(principals)
+    schedule = {name: np.full((len(tenure), tenure.max(initial=0)), np.nan) for name in SCHEDULE_COLUMNS}
+    for month in range(tenure.max(initial=0)):
+        # Loans are stepped together, one month per pass
+        interest = np.floor(balance * rate + 0.5).astype('int64')
+        repaid = np.where(month == tenure - 1, balance, np.minimum(installment - interest, balance))
+        balance = balance - repaid
+        active = month < tenure
+        for name, values in zip(SCHEDULE_COLUMNS, (repaid + interest, repaid, interest, balance)):
+            schedule[name][active, month] = values[active] / 100
+    return installment / 100, schedule
+
+
+def amortization_schedule(principal, rate, tenure, installment=None):
+    """Month-by-month rows for a single loan."""
+    _, schedule = amortization_schedules([principal], [rate], [tenure], None if installment is None else [installment])
+    return [
+        {'month': month + 1, **{name: float(schedule[name][0, month]) for name in SCHEDULE_COLUMNS}}
+        for month in range(tenure)
+    ]
+
+
+def export_active_schedules(path, today=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Write schedules of every active loan (end_date >= today) to a CSV; returns the loan count."""
+    today = today or timezone.now().date()
+    loans = (
+        Loan.objects.filter(end_date__gte=today, tenure__gt=0)
+        .order_by('loan_id')
+        .values_list('loan_id', 'loan_amount', 'interest_rate', 'tenure', 'monthly_payment')
+        .iterator(chunk_size=chunk_size)
+    )
+    exported = 0
+    with open(path, 'w', newline='') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(['loan_id', 'month'] + SCHEDULE_COLUMNS)
+        while chunk := list(islice(loans, chunk_size)):
+            loan_ids, amounts, rates, tenures, payments = zip(*chunk)
+            _, schedule = amortization_schedules([float(a) for a in amounts], rates, tenures, [float(p) for p in payments])
+            for row, (loan_id, tenure) in enumerate(zip(loan_ids, tenures)):
+                columns = [schedule[name][row, :tenure].tolist() for name in SCHEDULE_COLUMNS]
+                writer.writerows([loan_id, month + 1, *values] for month, values in enumerate(zip(*columns)))
+            exported += len(chunk)
+    return exported
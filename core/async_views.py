@@ -0,0 +1,124 @@
+"""Async versions of the read-heavy endpoints, routed in place of the DRF views under ASGI.
+
+Authentication, permissions, throttling and error responses are DRF's own,
+from the configured defaults, run off the event loop; the handlers return
+the same JSON. Queries go through Django's async ORM, so a slow query holds a
+thread rather than a whole worker.
+"""
+import asyncio
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.views import APIView
+
+from .credit_profile import acurrent_credit_profile
+from .loan_versions import acached_loan_payload, conditional_response
+from .models import Customer
+from .renderers import FastJSONRenderer
+from .scoring import check_eligibility
+from .serializers import UserProfileSerializer
+from .views import ViewLoanAPIView, ViewLoansByCustomerAPIView
+
+
+_request_slots = weakref.WeakKeyDictionary()
+
+
+def request_slots():
+    """Per-event-loop cap on requests in flight; each holds a thread and a database connection."""
+    loop = asyncio.get_running_loop()
+    if loop not in _request_slots:
+        _request_slots[loop] = asyncio.Semaphore(settings.ASYNC_VIEW_CONCURRENCY)
+    return _request_slots[loop]
+
+
+def json_response(data, status=status.HTTP_200_OK):
+    return HttpResponse(FastJSONRenderer().render(data), content_type=FastJSONRenderer.media_type, status=status)
+
+
+class AsyncAPIView(APIView):
+    """APIView with async handlers.
+
+    ``initial()`` (authentication, permissions and throttles, which read the
+    session, token and throttle stores synchronously) runs through
+    sync_to_async; exceptions become responses through DRF's handle_exception.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        # Requests past the cap wait on the event loop instead of opening more connections
+        async with request_slots():
+            try:
+                await sync_to_async(self.initial)(request, *args, **kwargs)
+                if request.method.lower() in self.http_method_names:
+                    handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+                else:
+                    handler = self.http_method_not_allowed
+                response = handler(request, *args, **kwargs)
+                if asyncio.iscoroutine(response):
+                    response = await response
+            except Exception as exc:
+                response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+class AsyncViewLoanAPIView(AsyncAPIView):
+    primary_reads = True
+
+    async def get(self, request, loan_id):
+        async def build(customer_pk):
+            return ViewLoanAPIView.payload(await ViewLoanAPIView.row(loan_id, customer_pk).afirst())
+
+        entry = await acached_loan_payload(ViewLoanAPIView.cache_key(loan_id), ViewLoanAPIView.owner(loan_id).afirst, build)
+        if entry is None:
+            return json_response({'error': 'Loan not found'}, status.HTTP_404_NOT_FOUND)
+        return conditional_response(request, entry, json_response)
+
+
+class AsyncViewLoansByCustomerAPIView(AsyncAPIView):
+    primary_reads = True
+
+    async def get(self, request, customer_id):
+        now = timezone.now()
+
+        async def build(customer_pk):
+            return ViewLoansByCustomerAPIView.payload([loan async for loan in ViewLoansByCustomerAPIView.rows(customer_pk, now.date())])
+
+        entry = await acached_loan_payload(
+            ViewLoansByCustomerAPIView.cache_key(customer_id, now),
+            ViewLoansByCustomerAPIView.owner(customer_id).afirst,
+            build,
+            valid_from=ViewLoansByCustomerAPIView.month_start(now),
+        )
+        if entry is None:
+            return json_response({'error': 'Customer not found'}, status.HTTP_404_NOT_FOUND)
+        return conditional_response(request, entry, json_response)
+
+
+class AsyncCheckEligibilityAPIView(AsyncAPIView):
+    primary_reads = True
+
+    async def post(self, request):
+        data = request.data
+        customer_id = data.get('customer_id')
+        try:
+            customer = await Customer.objects.select_related('credit_profile').aget(customer_id=customer_id)
+        except Customer.DoesNotExist:
+            return json_response({'error': 'Customer not found'}, status.HTTP_404_NOT_FOUND)
+        profile = await acurrent_credit_profile(customer)
+        return json_response(check_eligibility(
+            customer, profile, customer_id, data.get('loan_amount'), data.get('interest_rate'), data.get('tenure'),
+        ))
+
+
+class AsyncUserProfileView(AsyncAPIView):
+    async def get(self, request):
+        return json_response(UserProfileSerializer(request.user).data)
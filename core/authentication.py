@@ -0,0 +1,104 @@
+"""DRF token authentication served from caches instead of a token/user join per request."""
+import copy
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from .caches import cache_is_shared
+
+# Process-local copies: token cache key -> (token with its user, expiry on the monotonic clock)
+_local_tokens = {}
+LOCAL_TOKENS_MAX = 10_000
+
+
+def token_cache_key(key):
+    # Hashed, and mapped to the user's id alone, so the shared cache never holds usable credentials
+    return 'auth-token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def forget_tokens(keys):
+    """Drop these tokens from the caches once the current transaction commits."""
+    cache_keys = [token_cache_key(key) for key in keys]
+    if not cache_keys:
+        return
+
+    def forget():
+        cache.delete_many(cache_keys)
+        for cache_key in cache_keys:
+            _local_tokens.pop(cache_key, None)
+    transaction.on_commit(forget)
+
+
+def _copy(token):
+    # Each request gets its own token and user, so attributes set on request.user (or a save) never reach another request
+    token = copy.copy(token)
+    token.user = copy.copy(token.user)
+    return token
+
+
+def _local_token(cache_key):
+    entry = _local_tokens.get(cache_key)
+    if entry is not None and entry[1] > time.monotonic():
+        return _copy(entry[0])
+    return None
+
+
+def _keep_local(cache_key, token):
+    if len(_local_tokens) >= LOCAL_TOKENS_MAX:
+        _local_tokens.clear()
+    _local_tokens[cache_key] = (_copy(token), time.monotonic() + settings.TOKEN_AUTH_LOCAL_TTL)
+
+
+def _active(token):
+    if not token.user.is_active:
+        raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+    return (token.user, token)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """``Authorization: Token <key>``, resolved from a short-lived in-process copy, then the shared cache.
+
+    The shared cache only maps the token to its user's id, and is skipped
+    unless every process shares it. The user is read fresh on each shared hit.
+    Deleting a token or saving its user clears the caches straight away; other
+    processes' copies, and changes made by queryset ``update()`` (which sends
+    no signals), take effect within ``TOKEN_AUTH_LOCAL_TTL`` seconds.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        token = _local_token(cache_key)
+        if token is None:
+            shared = cache_is_shared()
+            user_id = cache.get(cache_key) if shared else None
+            if user_id is None:
+                token = self.fetch_token(key)
+                if shared:
+                    cache.set(cache_key, token.user_id, settings.TOKEN_AUTH_CACHE_TIMEOUT)
+            else:
+                token = self.token_of(key, self.fetch_user(user_id))
+            _keep_local(cache_key, token)
+        return _active(token)
+
+    def fetch_token(self, key):
+        try:
+            return self.get_model().objects.select_related('user').get(key=key)
+        except self.get_model().DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+    @staticmethod
+    def fetch_user(user_id):
+        try:
+            return get_user_model().objects.get(pk=user_id)
+        except get_user_model().DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+    def token_of(self, key, user):
+        return self.get_model()(key=key, user=user)
@@ -0,0 +1,13 @@
+"""Which caches are shared between processes."""
+from django.conf import settings
+
+# Backends whose entries only the process that wrote them can see
+PROCESS_LOCAL_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def cache_is_shared(alias='default'):
+    """Whether every web and Celery process reads and writes the same ``alias`` cache."""
+    return settings.CACHES[alias]['BACKEND'] not in PROCESS_LOCAL_BACKENDS
@@ -0,0 +1,92 @@
+"""Maintained loan status counters and the cached admin dashboard built on them."""
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import Loan, LoanStatusCounter
+
+COUNTER_SHARDS = 8
+LOAN_STATUSES = [status for status, _ in Loan._meta.get_field('status').choices]
+DASHBOARD_CACHE_KEY = 'admin-dashboard'
+DASHBOARD_REFRESH_LOCK = 'admin-dashboard:refreshing'
+
+# Set when this thread's request served a stale dashboard and won the refresh lock
+_pending = threading.local()
+
+
+def loan_status_counts():
+    """True per-status loan counts, in one conditional aggregate."""
+    return Loan.objects.aggregate(**{status: Count('pk', filter=Q(status=status)) for status in LOAN_STATUSES})
+
+
+def counter_totals():
+    rows = LoanStatusCounter.objects.values('status').annotate(total=Sum('count')).order_by()
+    return {row['status']: row['total'] for row in rows}
+
+
+def adjust_loan_counter(status, delta):
+    """Add ``delta`` to one shard of ``status``, inside the caller's transaction.
+
+    A no-op until the counters have been seeded by reconcile_loan_counters.
+    """
+    if status in LOAN_STATUSES and delta:
+        LoanStatusCounter.objects.filter(status=status, shard=random.randrange(COUNTER_SHARDS)).update(count=F('count') + delta)
+
+
+def reconcile_loan_counters():
+    """Reset the counters to the true counts; returns the drift corrected per status."""
+    with transaction.atomic():
+        LoanStatusCounter.objects.bulk_create(
+            [LoanStatusCounter(status=status, shard=shard) for status in LOAN_STATUSES for shard in range(COUNTER_SHARDS)],
+            ignore_conflicts=True,
+        )
+        # Holding every shard makes concurrent adjustments wait for the recount
+        list(LoanStatusCounter.objects.select_for_update().values_list('pk', flat=True))
+        before = counter_totals()
+        counts = loan_status_counts()
+        LoanStatusCounter.objects.filter(shard__gt=0).update(count=0)
+        for status, count in counts.items():
+            LoanStatusCounter.objects.filter(status=status, shard=0).update(count=count)
+    return {status: count - before.get(status, 0) for status, count in counts.items()}
+
+
+def refresh_dashboard_counts():
+    """Rebuild the cached dashboard from the counters (seeding them on first use)."""
+    totals = counter_totals()
+    if not totals:
+        reconcile_loan_counters()
+        totals = counter_totals()
+    counts = {
+        'total_users': User.objects.count(),
+        'total_loans': sum(totals.values()),
+        'approved_loans': totals.get('approved', 0),
+        'pending_loans': totals.get('pending', 0),
+        'rejected_loans': totals.get('rejected', 0),
+    }
+    entry = {'counts': counts, 'fresh_until': time.time() + settings.DASHBOARD_CACHE_FRESH}
+    cache.set(DASHBOARD_CACHE_KEY, entry, settings.DASHBOARD_CACHE_FRESH + settings.DASHBOARD_CACHE_STALE)
+    cache.delete(DASHBOARD_REFRESH_LOCK)
+    return counts
+
+
+def dashboard_counts():
+    """Dashboard counts from cache; once stale they are still served, and one request refreshes them after its response."""
+    entry = cache.get(DASHBOARD_CACHE_KEY)
+    if entry is None:
+        return refresh_dashboard_counts()
+    if entry['fresh_until'] < time.time() and cache.add(DASHBOARD_REFRESH_LOCK, True, settings.DASHBOARD_CACHE_FRESH):
+        _pending.refresh = True
+    return entry['counts']
+
+
+def refresh_scheduled_dashboard():
+    """Run the refresh a stale dashboard_counts() read scheduled on this thread, if any."""
+    if getattr(_pending, 'refresh', False):
+        _pending.refresh = False
+        refresh_dashboard_counts()
@@ -0,0 +1,155 @@
+"""Maintained per-customer loan aggregates used by the eligibility checks."""
+from decimal import Decimal
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.db.models import Case, Count, DecimalField, F, Min, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Customer, CustomerCreditProfile, Loan
+
+PROFILE_FIELDS = [
+    'total_emis', 'emis_paid_on_time', 'loan_count', 'current_year_loan_count',
+    'total_volume', 'active_debt', 'active_emi_sum', 'active_until', 'computed_on',
+]
+DEFAULT_CHUNK_SIZE = 2000
+
+ZERO = Value(Decimal('0'), output_field=DecimalField())
+
+
+def _money(expression):
+    return Coalesce(expression, ZERO, output_field=DecimalField())
+
+
+def _aggregates(loans, today):
+    """One grouped query returning the profile aggregates per customer pk."""
+    active = Q(end_date__gte=today)
+    rows = loans.values('customer').annotate(
+        total_emis=Sum('tenure'),
+        emis_paid_sum=Sum('emis_paid_on_time'),
+        loan_count=Count('id'),
+        current_year_loan_count=Count('id', filter=Q(start_date__year=today.year)),
+        total_volume=_money(Sum('loan_amount')),
+        active_debt=_money(Sum('loan_amount', filter=active)),
+        active_emi_sum=_money(Sum('monthly_payment', filter=active)),
+        active_until=Min('end_date', filter=active),
+    ).order_by()
+    aggregates = {}
+    for row in rows:
+        customer_pk = row.pop('customer')
+        row['emis_paid_on_time'] = row.pop('emis_paid_sum')
+        aggregates[customer_pk] = row
+    return aggregates
+
+
+def _save_profiles(customer_pks, today):
+    aggregates = _aggregates(Loan.objects.filter(customer__in=customer_pks), today)
+    profiles = [
+        CustomerCreditProfile(customer_id=pk, computed_on=today, **aggregates.get(pk, {}))
+        for pk in customer_pks
+    ]
+    CustomerCreditProfile.objects.bulk_create(
+        profiles,
+        update_conflicts=True,
+        unique_fields=['customer'],
+        update_fields=PROFILE_FIELDS,
+    )
+    return profiles
+
+
+def rebuild_credit_profiles(customer_pks=None, today=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Recompute profiles in bulk, for all customers or the given pks; returns the count."""
+    today = today or timezone.now().date()
+    customers = Customer.objects.order_by('pk')
+    if customer_pks is not None:
+        customers = customers.filter(pk__in=list(customer_pks))
+    pks = customers.values_list('pk', flat=True).iterator(chunk_size=chunk_size)
+    rebuilt = 0
+    while chunk := list(islice(pks, chunk_size)):
+        rebuilt += len(_save_profiles(chunk, today))
+    return rebuilt
+
+
+def refresh_credit_profile(customer_pk, today=None):
+    """Recompute and return one customer's profile."""
+    return _save_profiles([customer_pk], today or timezone.now().date())[0]
+
+
+def _loaded_profile(customer, today):
+    """The customer's already-fetched profile if it is current, else None."""
+    try:
+        profile = customer.credit_profile
+    except CustomerCreditProfile.DoesNotExist:
+        return None
+    return profile if profile is not None and profile.is_current(today) else None
+
+
+def current_credit_profile(customer, today=None):
+    """Return the customer's profile, recomputing it only if missing or stale."""
+    today = today or timezone.now().date()
+    profile = _loaded_profile(customer, today)
+    if profile is None:
+        profile = refresh_credit_profile(customer.pk, today)
+        customer.credit_profile = profile
+    return profile
+
+
+async def acurrent_credit_profile(customer, today=None):
+    """Async :func:`current_credit_profile`; a current, select_related profile needs no query."""
+    today = today or timezone.now().date()
+    profile = _loaded_profile(customer, today)
+    if profile is None:
+        profile = await sync_to_async(refresh_credit_profile)(customer.pk, today)
+        customer.credit_profile = profile
+    return profile
+
+
+def _decimal(value):
+    return Value(Decimal(str(value)), output_field=DecimalField())
+
+
+def current_credit_profiles(customers, today=None):
+    """Attach a current profile to each customer, recomputing stale ones in bulk."""
+    today = today or timezone.now().date()
+    stale = []
+    for customer in customers:
+        try:
+            profile = customer.credit_profile
+        except CustomerCreditProfile.DoesNotExist:
+            profile = None
+        if profile is None or not profile.is_current(today):
+            stale.append(customer)
+    for start in range(0, len(stale), DEFAULT_CHUNK_SIZE):
+        chunk = stale[start:start + DEFAULT_CHUNK_SIZE]
+        for customer, profile in zip(chunk, _save_profiles([customer.pk for customer in chunk], today)):
+            customer.credit_profile = profile
+    return customers
+
+
+def record_new_loan(loan, today=None):
+    """Fold a newly created loan into its customer's profile with a single UPDATE."""
+    today = today or timezone.now().date()
+    changes = {
+        'total_emis': F('total_emis') + loan.tenure,
+        'emis_paid_on_time': F('emis_paid_on_time') + loan.emis_paid_on_time,
+        'loan_count': F('loan_count') + 1,
+        'total_volume': F('total_volume') + _decimal(loan.loan_amount),
+    }
+    if loan.start_date.year == today.year:
+        changes['current_year_loan_count'] = F('current_year_loan_count') + 1
+    if loan.end_date >= today:
+        changes['active_debt'] = F('active_debt') + _decimal(loan.loan_amount)
+        changes['active_emi_sum'] = F('active_emi_sum') + _decimal(loan.monthly_payment)
+        changes['active_until'] = Case(
+            When(active_until__lte=loan.end_date, then=F('active_until')),
+            default=Value(loan.end_date),
+        )
+    updated = CustomerCreditProfile.objects.filter(
+        Q(active_until__isnull=True) | Q(active_until__gte=today),
+        customer_id=loan.customer_id,
+        computed_on__year=today.year,
+        computed_on__lte=today,
+    ).update(**changes)
+    if not updated:
+        refresh_credit_profile(loan.customer_id, today)
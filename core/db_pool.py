@@ -0,0 +1,37 @@
+"""Metrics for the per-process psycopg connection pools (``DATABASES[...]['OPTIONS']['pool']``)."""
+from django.db import connections
+
+
+def pool_metrics():
+    """Size, wait and checkout figures of this process's open pools, by database alias.
+
+    Counters are cumulative since the pool opened, as psycopg_pool keeps them.
+    Checkout time is how long connections spent lent out of the pool.
+    """
+    metrics = {}
+    for alias in connections:
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is None or pool.closed:
+            continue
+        stats = pool.get_stats()
+        checkouts = stats.get('requests_num', 0)
+        metrics[alias] = {
+            'pool_min': stats['pool_min'],
+            'pool_max': stats['pool_max'],
+            'pool_size': stats['pool_size'],
+            'pool_available': stats['pool_available'],
+            'requests_waiting': stats['requests_waiting'],
+            'checkouts': checkouts,
+            'checkouts_queued': stats.get('requests_queued', 0),
+            'checkout_errors': stats.get('requests_errors', 0),
+            'wait_ms_total': stats.get('requests_wait_ms', 0),
+            'wait_ms_avg': stats.get('requests_wait_ms', 0) / checkouts if checkouts else 0,
+            'checkout_ms_total': stats.get('usage_ms', 0),
+            'checkout_ms_avg': stats.get('usage_ms', 0) / checkouts if checkouts else 0,
+            'connections_opened': stats.get('connections_num', 0),
+            'connect_ms_total': stats.get('connections_ms', 0),
+            'connections_failed': stats.get('connections_errors', 0),
+            'connections_lost': stats.get('connections_lost', 0),
+            'returns_bad': stats.get('returns_bad', 0),
+        }
+    return metrics
@@ -0,0 +1,35 @@
+"""Primary/replica routing: reads of safe requests can go to ``DATABASE_REPLICAS``, everything else to the primary."""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Off by default, so Celery tasks, management commands and unsafe requests read from the primary
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def allow_replica_reads(allowed):
+    """Let (or stop) reads in the current context go to a replica; returns a token for :func:`reset_replica_reads`."""
+    return _replica_reads.set(allowed)
+
+
+def reset_replica_reads(token):
+    _replica_reads.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """Reads go to a random replica while the current context allows it; writes always go to the primary."""
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and settings.DATABASE_REPLICAS:
+            return random.choice(settings.DATABASE_REPLICAS)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Also for instances read from a replica, which would otherwise be saved back to it
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold copies of the primary's rows
+        return True
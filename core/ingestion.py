@@ -0,0 +1,333 @@
+"""Bulk ingestion helpers for the customer and loan extracts."""
+import hashlib
+import os
+import time
+from functools import partial
+
+import pandas as pd
+from django.db import DatabaseError, transaction
+
+from .credit_profile import rebuild_credit_profiles
+from .loan_versions import bump_loan_versions
+from .models import Customer, CustomerFingerprint, IngestionCheckpoint, Loan, LoanFingerprint
+from .readers import count_rows, iter_batches
+
+DEFAULT_CHUNK_SIZE = 2000
+
+CUSTOMER_UPDATE_FIELDS = [
+    'first_name', 'last_name', 'age', 'phone_number',
+    'monthly_salary', 'approved_limit', 'current_debt',
+]
+LOAN_UPDATE_FIELDS = [
+    'customer', 'loan_amount', 'tenure', 'interest_rate',
+    'monthly_payment', 'emis_paid_on_time', 'start_date', 'end_date',
+]
+
+
+def _column(frame, header, default=None):
+    if header in frame:
+        return frame[header]
+    return pd.Series(default, index=frame.index, dtype=object)
+
+
+def _number(series, default=0):
+    return pd.to_numeric(series, errors='coerce').fillna(default).astype('float64')
+
+
+def _integer(series, default=0):
+    return pd.to_numeric(series, errors='coerce').fillna(default).round().astype('int64')
+
+
+def _text(series, max_length):
+    # Excel hands phone numbers back as floats once a column has gaps
+    if pd.api.types.is_float_dtype(series) and (series.dropna() % 1 == 0).all():
+        series = series.astype('Int64')
+    return series.astype('string').fillna('').str.slice(0, max_length)
+
+
+def _date(series):
+    return pd.to_datetime(series, errors='coerce').dt.date
+
+
+def _drop_invalid(frame, required, key):
+    """Drop rows missing a required value and keep the last row per key."""
+    valid = frame[required].notna().all(axis=1)
+    clean = frame[valid]
+    deduped = clean.drop_duplicates(key, keep='last')
+    counts = {
+        'rejected': int((~valid).sum()),
+        'duplicates': len(clean) - len(deduped),
+    }
+    return deduped, counts
+
+
+def clean_customer_frame(raw):
+    """Vectorised cleaning of a raw customer sheet; returns (frame, counts)."""
+    frame = pd.DataFrame({
+        'customer_id': pd.to_numeric(_column(raw, 'Customer ID'), errors='coerce'),
+        'first_name': _text(_column(raw, 'First Name', ''), 100),
+        'last_name': _text(_column(raw, 'Last Name', ''), 100),
+        'age': pd.to_numeric(_column(raw, 'Age'), errors='coerce').round().astype('Int64'),
+        'phone_number': _text(_column(raw, 'Phone Number', ''), 15),
+        'monthly_salary': _number(_column(raw, 'Monthly Salary')),
+        'approved_limit': _number(_column(raw, 'Approved Limit')),
+        'current_debt': _number(_column(raw, 'Current Debt')),
+    }, index=raw.index)
+    frame, counts = _drop_invalid(frame, ['customer_id'], 'customer_id')
+    return frame.astype({'customer_id': 'int64'}), counts
+
+
+def clean_loan_frame(raw):
+    """Vectorised cleaning of a raw loan sheet; returns (frame, counts).
+
+    ``customer_id`` in the result is still the external customer number.
+    """
+    frame = pd.DataFrame({
+        'customer_id': pd.to_numeric(_column(raw, 'Customer ID'), errors='coerce'),
+        'loan_id': pd.to_numeric(_column(raw, 'Loan ID'), errors='coerce'),
+        'loan_amount': _number(_column(raw, 'Loan Amount')),
+        'tenure': _integer(_column(raw, 'Tenure')),
+        'interest_rate': _number(_column(raw, 'Interest Rate')),
+        'monthly_payment': _number(_column(raw, 'Monthly payment')),
+        'emis_paid_on_time': _integer(_column(raw, 'EMIs paid on Time')),
+        'start_date': _date(_column(raw, 'Start date')),
+        'end_date': _date(_column(raw, 'End date')),
+    }, index=raw.index)
+    frame, counts = _drop_invalid(frame, ['customer_id', 'loan_id', 'start_date', 'end_date'], 'loan_id')
+    return frame.astype({'customer_id': 'int64', 'loan_id': 'int64'}), counts
+
+
+def _records(frame):
+    return frame.astype(object).where(frame.notna(), None).to_dict('records')
+
+
+def _upsert(model, key, rows, update_fields):
+    """Insert-or-update rows on ``key``; returns (inserted, updated)."""
+    if not rows:
+        return 0, 0
+    keys = [row[key] for row in rows]
+    existing = model.objects.filter(**{f'{key}__in': keys}).count()
+    model.objects.bulk_create(
+        [model(**row) for row in rows],
+        update_conflicts=True,
+        unique_fields=[key],
+        update_fields=update_fields,
+    )
+    return len(rows) - existing, existing
+
+
+def row_digests(frame):
+    """Signed 64-bit content hash of each cleaned row."""
+    return pd.Series(pd.util.hash_pandas_object(frame, index=False).to_numpy().view('int64'), index=frame.index)
+
+
+def _skip_unchanged(frame, key, digests, stored):
+    """Drop rows whose digest matches the stored fingerprint; returns (frame, digests, skipped)."""
+    unchanged = frame[key].map(stored).eq(digests)
+    return frame[~unchanged], digests[~unchanged], int(unchanged.sum())
+
+
+def _save_fingerprints(model, owner, pks, digests):
+    model.objects.bulk_create(
+        [model(**{f'{owner}_id': pk, 'digest': digest}) for pk, digest in zip(pks, digests)],
+        update_conflicts=True,
+        unique_fields=[owner],
+        update_fields=['digest'],
+    )
+
+
+def load_customer_chunk(frame, delta=False):
+    """Upsert one cleaned customer chunk.
+
+    With ``delta`` only rows whose content fingerprint changed are written.
+    """
+    rows = len(frame)
+    unchanged = 0
+    if delta:
+        digests = row_digests(frame)
+        stored = dict(CustomerFingerprint.objects.filter(
+            customer__customer_id__in=frame['customer_id'].tolist(),
+        ).values_list('customer__customer_id', 'digest'))
+        frame, digests, unchanged = _skip_unchanged(frame, 'customer_id', digests, stored)
+    inserted, updated = _upsert(Customer, 'customer_id', _records(frame), CUSTOMER_UPDATE_FIELDS)
+    if len(frame):
+        pks = frame['customer_id'].map(customer_pk_map(frame['customer_id'].tolist()))
+        # Loan views embed customer details; bulk upserts skip the signals that bump them
+        bump_loan_versions(pks.tolist())
+        if delta:
+            _save_fingerprints(CustomerFingerprint, 'customer', pks.tolist(), digests.tolist())
+    return {'rows': rows, 'inserted': inserted, 'updated': updated, 'unchanged': unchanged, 'rejected': 0}
+
+
+def load_loan_chunk(frame, customer_pks, delta=False):
+    """Upsert one cleaned loan chunk, rejecting loans of unknown customers.
+
+    With ``delta`` only rows whose content fingerprint changed are written.
+    """
+    rows = len(frame)
+    pks = frame['customer_id'].map(customer_pks)
+    known = pks.notna()
+    unchanged = 0
+    if delta:
+        # Fingerprint the row as it appears in the file, before ids are resolved
+        digests = row_digests(frame)[known]
+        frame = frame[known]
+        stored = dict(LoanFingerprint.objects.filter(
+            loan__loan_id__in=frame['loan_id'].tolist(),
+        ).values_list('loan__loan_id', 'digest'))
+        frame, digests, unchanged = _skip_unchanged(frame, 'loan_id', digests, stored)
+    else:
+        frame = frame[known]
+    frame = frame.assign(customer_id=pks[frame.index].astype('int64'))
+    inserted, updated = _upsert(Loan, 'loan_id', _records(frame), LOAN_UPDATE_FIELDS)
+    # bulk_create skips the post_save signal that keeps credit profiles in step
+    rebuild_credit_profiles(frame['customer_id'].unique().tolist())
+    bump_loan_versions(frame['customer_id'].unique().tolist())
+    if delta and len(frame):
+        loan_pks = dict(Loan.objects.filter(loan_id__in=frame['loan_id'].tolist()).values_list('loan_id', 'pk'))
+        _save_fingerprints(LoanFingerprint, 'loan', frame['loan_id'].map(loan_pks).tolist(), digests.tolist())
+    return {
+        'rows': rows,
+        'inserted': inserted,
+        'updated': updated,
+        'unchanged': unchanged,
+        'rejected': int((~known).sum()),
+    }
+
+
+def customer_pk_map(customer_ids=None):
+    """Map external ``customer_id`` -> primary key, optionally for a subset."""
+    queryset = Customer.objects.all()
+    if customer_ids is not None:
+        queryset = queryset.filter(customer_id__in=list(customer_ids))
+    return dict(queryset.values_list('customer_id', 'pk'))
+
+
+def new_report(counts=None):
+    report = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'rejected': 0, 'duplicates': 0, 'chunks': []}
+    for name, value in (counts or {}).items():
+        report[name] += value
+    return report
+
+
+def record_chunk(report, counts, seconds):
+    for name in ('inserted', 'updated', 'unchanged', 'rejected'):
+        report[name] += counts[name]
+    report['chunks'].append(dict(counts, seconds=round(seconds, 4)))
+
+
+def run_chunks(frame, load, chunk_size=DEFAULT_CHUNK_SIZE, report=None):
+    """Feed ``frame`` to ``load`` in slices, each slice in its own transaction."""
+    report = report if report is not None else new_report()
+    for start in range(0, len(frame), chunk_size):
+        started = time.perf_counter()
+        with transaction.atomic():
+            counts = load(frame.iloc[start:start + chunk_size])
+        record_chunk(report, counts, time.perf_counter() - started)
+    return report
+
+
+def ingest_customers(raw, chunk_size=DEFAULT_CHUNK_SIZE, delta=False):
+    frame, counts = clean_customer_frame(raw)
+    return run_chunks(frame, partial(load_customer_chunk, delta=delta), chunk_size, new_report(counts))
+
+
+def ingest_loans(raw, chunk_size=DEFAULT_CHUNK_SIZE, customer_pks=None, delta=False):
+    frame, counts = clean_loan_frame(raw)
+    if customer_pks is None:
+        customer_pks = customer_pk_map()
+    load = partial(load_loan_chunk, customer_pks=customer_pks, delta=delta)
+    return run_chunks(frame, load, chunk_size, new_report(counts))
+
+
+def ingestion_job_id(*paths):
+    """Stable id for a set of input files; changes when any file is replaced."""
+    digest = hashlib.sha1()
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f'{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns};'.encode())
+    return digest.hexdigest()
+
+
+def load_loan_batch(frame, delta=False):
+    """Upsert a streamed loan batch, resolving only the customers it references."""
+    return load_loan_chunk(frame, customer_pk_map(frame['customer_id'].unique().tolist()), delta)
+
+
+def stream_ingest(path, job_id, stage, clean, load, batch_size=DEFAULT_CHUNK_SIZE):
+    """Stream ``path`` in batches, committing each batch together with its checkpoint.
+
+    A rerun with the same ``job_id`` resumes after the last committed batch.
+    """
+    checkpoint, _ = IngestionCheckpoint.objects.get_or_create(job_id=job_id, stage=stage)
+    report = new_report()
+    report['resumed_from'] = checkpoint.rows_committed
+    if checkpoint.completed:
+        return report
+    position = checkpoint.rows_committed
+    for raw in iter_batches(path, batch_size, skip_rows=position):
+        started = time.perf_counter()
+        frame, counts = clean(raw)
+        with transaction.atomic():
+            result = load(frame)
+            position += len(raw)
+            IngestionCheckpoint.objects.filter(pk=checkpoint.pk).update(rows_committed=position)
+        result['rows'] = len(raw)
+        result['rejected'] += counts['rejected']
+        report['duplicates'] += counts['duplicates']
+        record_chunk(report, result, time.perf_counter() - started)
+    IngestionCheckpoint.objects.filter(pk=checkpoint.pk).update(completed=True)
+    return report
+
+
+def shard_ranges(path, shard_size):
+    """Split the data rows of ``path`` into [start, stop) ranges of ``shard_size``."""
+    total = count_rows(path)
+    return [(start, min(start + shard_size, total)) for start in range(0, total, shard_size)]
+
+
+def ingest_loan_range(path, start, stop, batch_size=DEFAULT_CHUNK_SIZE, delta=False):
+    """Load data rows [start, stop) of a loan file.
+
+    Batches that fail in the database are rolled back and reported under
+    ``failed`` as row ranges, so they can be retried later.
+    """
+    report = new_report()
+    report['failed'] = []
+    position = start
+    for raw in iter_batches(path, batch_size, skip_rows=start, max_rows=stop - start):
+        started = time.perf_counter()
+        frame, counts = clean_loan_frame(raw)
+        try:
+            with transaction.atomic():
+                result = load_loan_batch(frame, delta)
+        except DatabaseError:
+            report['failed'].append([position, position + len(raw)])
+        else:
+            result['rows'] = len(raw)
+            result['rejected'] += counts['rejected']
+            report['duplicates'] += counts['duplicates']
+            record_chunk(report, result, time.perf_counter() - started)
+        position += len(raw)
+    return report
+
+
+def merge_reports(reports):
+    """Combine per-shard reports into one, keeping the chunk timings in order."""
+    merged = new_report()
+    merged['failed'] = []
+    for report in reports:
+        for name in ('inserted', 'updated', 'unchanged', 'rejected', 'duplicates'):
+            merged[name] += report[name]
+        merged['chunks'].extend(report['chunks'])
+        merged['failed'].extend(report.get('failed', []))
+    return merged
+
+
+def reconcile_failed_ranges(path, report, delta=False):
+    """Retry failed row ranges one row at a time; rows that still fail stay in ``failed``."""
+    retries = [ingest_loan_range(path, start, stop, 1, delta) for start, stop in report['failed']]
+    report['failed'] = []
+    reconciled = merge_reports([report] + retries)
+    reconciled['reconciled_rows'] = sum(row['inserted'] + row['updated'] for row in retries)
+    return reconciled
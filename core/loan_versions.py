@@ -0,0 +1,140 @@
+"""Per-customer loan version stamps behind the cached, conditional loan read endpoints.
+
+Stamps are bumped by whichever process writes, web or Celery, so they only
+work in a cache every process shares. With a per-process cache (no
+``REDIS_URL``) nothing is cached and each response is tagged by its content.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from .caches import cache_is_shared
+
+
+def version_key(customer_pk):
+    return f'loan-version:{customer_pk}'
+
+
+def new_version():
+    # Nanosecond clock: unique per bump and doubles as the Last-Modified time
+    return time.time_ns()
+
+
+def loan_version(customer_pk):
+    """The customer's current stamp, starting one if the cache has none."""
+    key = version_key(customer_pk)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, new_version(), settings.LOAN_VERSION_TIMEOUT)
+        version = cache.get(key)
+    return version
+
+
+async def aloan_version(customer_pk):
+    """Async :func:`loan_version`."""
+    key = version_key(customer_pk)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, new_version(), settings.LOAN_VERSION_TIMEOUT)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_loan_versions(customer_pks):
+    """Give these customers new stamps once the current transaction commits."""
+    keys = {version_key(pk) for pk in customer_pks if pk is not None}
+    if keys:
+        transaction.on_commit(lambda: cache.set_many({key: new_version() for key in keys}, settings.LOAN_VERSION_TIMEOUT))
+
+
+def _fresh_entry(cache_key):
+    entry = cache.get(cache_key)
+    if entry is not None and entry['version'] == cache.get(version_key(entry['customer'])):
+        return entry
+    return None
+
+
+async def _afresh_entry(cache_key):
+    entry = await cache.aget(cache_key)
+    if entry is not None and entry['version'] == await cache.aget(version_key(entry['customer'])):
+        return entry
+    return None
+
+
+def _versioned_entry(customer_pk, version, payload, valid_from):
+    modified = version // 10 ** 9
+    tag = f'{customer_pk}-{version}'
+    if valid_from is not None:
+        modified, tag = max(modified, valid_from), f'{tag}-{valid_from}'
+    return {'customer': customer_pk, 'version': version, 'etag': f'W/"{tag}"', 'modified': modified, 'payload': payload}
+
+
+def _uncached_entry(customer_pk, payload):
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()[:32]
+    return {'customer': customer_pk, 'version': None, 'etag': f'W/"{customer_pk}-{digest}"', 'modified': None, 'payload': payload}
+
+
+def cached_loan_payload(cache_key, resolve_customer, build, valid_from=None):
+    """Cache entry for a payload built from one customer's loans, or None if it doesn't exist.
+
+    The entry is reused while the customer's stamp is unchanged, without any
+    queries. Otherwise ``resolve_customer()`` finds the customer pk and
+    ``build(customer_pk)`` the payload. ``valid_from`` (epoch seconds) marks
+    payloads that also depend on the date. Without a shared cache the payload
+    is built on every call.
+    """
+    shared = cache_is_shared()
+    entry = _fresh_entry(cache_key) if shared else None
+    if entry is not None:
+        return entry
+    customer_pk = resolve_customer()
+    if customer_pk is None:
+        return None
+    # Read before the payload, so a write landing mid-build can't be cached under the new stamp
+    version = loan_version(customer_pk) if shared else None
+    payload = build(customer_pk)
+    if payload is None:
+        return None
+    if not shared:
+        return _uncached_entry(customer_pk, payload)
+    entry = _versioned_entry(customer_pk, version, payload, valid_from)
+    cache.set(cache_key, entry, settings.LOAN_VIEW_CACHE_TIMEOUT)
+    return entry
+
+
+async def acached_loan_payload(cache_key, resolve_customer, build, valid_from=None):
+    """Async :func:`cached_loan_payload`, for coroutine ``resolve_customer`` and ``build``."""
+    shared = cache_is_shared()
+    entry = await _afresh_entry(cache_key) if shared else None
+    if entry is not None:
+        return entry
+    customer_pk = await resolve_customer()
+    if customer_pk is None:
+        return None
+    version = await aloan_version(customer_pk) if shared else None
+    payload = await build(customer_pk)
+    if payload is None:
+        return None
+    if not shared:
+        return _uncached_entry(customer_pk, payload)
+    entry = _versioned_entry(customer_pk, version, payload, valid_from)
+    await cache.aset(cache_key, entry, settings.LOAN_VIEW_CACHE_TIMEOUT)
+    return entry
+
+
+def conditional_response(request, entry, response_class=Response):
+    """200 with the cached payload, or 304 when the client's ETag/Last-Modified still match."""
+    response = response_class(entry['payload'])
+    response['ETag'] = entry['etag']
+    if entry['modified'] is not None:
+        response['Last-Modified'] = http_date(entry['modified'])
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Accept'])
+    return get_conditional_response(request, etag=entry['etag'], last_modified=entry['modified'], response=response)
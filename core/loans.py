@@ -0,0 +1,95 @@
+"""Loan creation: one eligibility pass, block-reserved loan ids, atomic debt update."""
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, Value
+from django.db.models.functions import Coalesce
+
+from .credit_profile import current_credit_profile
+from .models import Customer, IdSequence, Loan
+from .scoring import check_eligibility
+
+LOAN_ID_SEQUENCE = 'loan_id'
+
+
+def reserve_id_block(name, size, floor=0):
+    """Reserve ``size`` consecutive ids from sequence ``name``; returns ``range``.
+
+    Ids never start below ``floor``, so values written by bulk ingestion are
+    skipped rather than handed out again.
+    """
+    with transaction.atomic():
+        sequence, _ = IdSequence.objects.select_for_update().get_or_create(name=name, defaults={'next_value': floor})
+        start = max(sequence.next_value, floor)
+        sequence.next_value = start + size
+        sequence.save(update_fields=['next_value'])
+    return range(start, start + size)
+
+
+class LoanIdAllocator:
+    """Hands out loan ids from a process-local block, reserving a new one when it runs dry."""
+
+    def __init__(self, block_size=None):
+        self.block_size = block_size
+        self._block = iter(())
+        self._lock = threading.Lock()
+
+    def next_id(self):
+        with self._lock:
+            loan_id = next(self._block, None)
+            if loan_id is None:
+                floor = (Loan.objects.aggregate(top=Max('loan_id'))['top'] or 0) + 1
+                self._block = iter(reserve_id_block(LOAN_ID_SEQUENCE, self.block_size or settings.LOAN_ID_BLOCK_SIZE, floor))
+                loan_id = next(self._block)
+            return loan_id
+
+    def discard(self):
+        with self._lock:
+            self._block = iter(())
+
+
+loan_ids = LoanIdAllocator()
+
+
+def _insert_loan(loan_id, customer_id, loan_amount, interest_rate, tenure, today):
+    """Lock the customer, decide, and on approval insert the loan and raise its debt."""
+    with transaction.atomic():
+        # Serialises creations per customer so each decision sees the previous loan; only the customer row is locked
+        customer = (Customer.objects.select_for_update(of=('self',)).select_related('credit_profile')
+                    .filter(customer_id=customer_id).first())
+        if customer is None:
+            return None, None
+        profile = current_credit_profile(customer, today)
+        eligibility = check_eligibility(customer, profile, customer_id, loan_amount, interest_rate, tenure)
+        if not eligibility['approval']:
+            return None, eligibility
+        loan = Loan.objects.create(
+            customer=customer,
+            loan_id=loan_id,
+            loan_amount=loan_amount,
+            tenure=tenure,
+            interest_rate=eligibility['corrected_interest_rate'],
+            monthly_payment=eligibility['monthly_installment'],
+            emis_paid_on_time=0,
+            start_date=today,
+            end_date=today + timedelta(days=30 * tenure),
+        )
+        Customer.objects.filter(pk=customer.pk).update(
+            current_debt=Coalesce(F('current_debt'), Value(Decimal(0))) + Decimal(str(loan_amount)),
+        )
+    return loan, eligibility
+
+
+def create_loan(customer_id, loan_amount, interest_rate, tenure, today=None):
+    """Returns ``(loan, eligibility)``; ``loan`` is None when not approved, both are None for an unknown customer."""
+    today = today or date.today()
+    # Drawn outside the transaction so the sequence row is never locked for a whole request
+    try:
+        return _insert_loan(loan_ids.next_id(), customer_id, loan_amount, interest_rate, tenure, today)
+    except IntegrityError:
+        # An id in our block was taken by an ingested loan; start a fresh block once
+        loan_ids.discard()
+        return _insert_loan(loan_ids.next_id(), customer_id, loan_amount, interest_rate, tenure, today)
@@ -0,0 +1,145 @@
+"""Structured JSON logging through a queue, so request threads never wait on the log file."""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, RotatingFileHandler, TimedRotatingFileHandler, WatchedFileHandler
+
+request_id = ContextVar('request_id', default='-')
+
+# LogRecord attributes that aren't ``extra`` fields
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id'}
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps each record with the id of the request being served, or ``-``."""
+
+    def filter(self, record):
+        record.request_id = request_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, request id and any ``extra`` fields."""
+    converter = time.gmtime
+
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + '.%03dZ' % record.msecs,
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', '-'),
+        }
+        data.update((key, value) for key, value in vars(record).items() if key not in RECORD_ATTRIBUTES)
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+class BatchFlushMixin:
+    """Leaves flushing to the writer thread, so a batch of records costs one write to disk."""
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+
+class BatchRotatingFileHandler(BatchFlushMixin, RotatingFileHandler):
+    pass
+
+
+class BatchTimedRotatingFileHandler(BatchFlushMixin, TimedRotatingFileHandler):
+    pass
+
+
+class BatchWatchedFileHandler(BatchFlushMixin, WatchedFileHandler):
+    pass
+
+
+def process_log_file(filename):
+    """``api.log`` -> ``api.<pid>.log``, the file only this process writes and rotates."""
+    root, extension = os.path.splitext(filename)
+    return f'{root}.{os.getpid()}{extension}'
+
+
+class QueueFileHandler(QueueHandler):
+    """Formats records in the caller and queues them for a background thread that appends them to a log file.
+
+    The writer takes everything queued (up to ``batch_size``) and flushes once
+    per batch. Without rotation every process appends to ``filename``, which
+    is reopened when an external tool (logrotate) moves it. With ``max_bytes``,
+    or ``when`` (as TimedRotatingFileHandler), each process rotates its own
+    ``<name>.<pid><ext>`` file, since processes rotating one file lose each
+    other's records. Once ``max_queued`` records are waiting (a stalled disk),
+    new ones are dropped and counted in ``dropped``.
+    """
+
+    def __init__(self, filename, max_bytes=0, backup_count=5, when=None, interval=1, batch_size=1000, max_queued=100_000):
+        super().__init__(queue.Queue(max_queued))
+        self.filename, self.max_bytes, self.backup_count, self.when, self.interval = filename, max_bytes, backup_count, when, interval
+        self.batch_size = batch_size
+        self.max_queued = max_queued
+        self.dropped = 0
+        self.start_writer()
+        # Forked children (Celery, gunicorn --preload) don't inherit the thread, and rotate files of their own
+        os.register_at_fork(after_in_child=self.start_writer)
+
+    def open_target(self):
+        if self.when:
+            return BatchTimedRotatingFileHandler(process_log_file(self.filename), when=self.when, interval=self.interval,
+                                                 backupCount=self.backup_count, delay=True, utc=True)
+        if self.max_bytes:
+            return BatchRotatingFileHandler(process_log_file(self.filename), maxBytes=self.max_bytes, backupCount=self.backup_count, delay=True)
+        return BatchWatchedFileHandler(self.filename, delay=True)
+
+    def start_writer(self):
+        self.target = self.open_target()
+        self.queue = queue.Queue(self.max_queued)
+        self.writer = threading.Thread(target=self.write_batches, name='log-writer', daemon=True)
+        self.writer.start()
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def write_batches(self):
+        pending, target = self.queue, self.target
+        reported = 0
+        while True:
+            batch = [pending.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(pending.get_nowait())
+                except queue.Empty:
+                    break
+            for record in batch:
+                if record is not None:
+                    target.handle(record)
+            if self.dropped != reported:
+                target.handle(self.dropped_record(self.dropped - reported))
+                reported = self.dropped
+            target.flush_batch()
+            if None in batch:
+                return
+
+    def dropped_record(self, count):
+        record = logging.makeLogRecord({
+            'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+            'msg': '%d log records dropped while the queue was full', 'args': (count,), 'dropped': count,
+        })
+        return self.prepare(record)
+
+    def close(self):
+        if self.writer.is_alive():
+            self.queue.put(None)
+            self.writer.join()
+        self.target.close()
+        super().close()
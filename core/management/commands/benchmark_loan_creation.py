@@ -0,0 +1,87 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connection
+from django.db.models import Max
+
+from core.loans import create_loan, loan_ids
+from core.models import Customer, Loan
+
+LOAN_AMOUNT = 1000
+
+
+class Command(BaseCommand):
+    help = ('Concurrent loan creation throughput with create_loan against the old view (count() + 1 loan ids and a '
+            'read-modify-write debt update), with the duplicate ids and lost debt of each. Writes to the configured '
+            'database and removes its customers and loans afterwards; run it against a scratch PostgreSQL database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=5)
+        parser.add_argument('--workers', type=int, default=16)
+        parser.add_argument('--requests', type=int, default=25, help='Loans each worker requests.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Concurrent row locking needs PostgreSQL')
+        customers = Customer.objects.filter(pk__in=[customer.pk for customer in seed(options['customers'])])
+        customer_ids = list(customers.values_list('customer_id', flat=True))
+        try:
+            for name, create in (('create_loan', lambda *quote: create_loan(*quote)[0]), ('legacy', legacy_create)):
+                customers.update(current_debt=0)
+                created, failed, elapsed = hammer(create, customer_ids, options['workers'], options['requests'])
+                lost = LOAN_AMOUNT * created - sum(customers.values_list('current_debt', flat=True))
+                self.stdout.write(f'{name:<12} {created / elapsed:7.0f} loans/s  {created} created  {failed} duplicate ids  {lost:.0f} debt lost')
+        finally:
+            customers.delete()
+            loan_ids.discard()
+
+
+def seed(count, history=10):
+    """Customers with a repaid loan history, so every 20% quote is approved."""
+    # Numbered after the existing customers and loans, so real ids are never touched
+    first_customer_id = (Customer.objects.aggregate(last=Max('customer_id'))['last'] or 0) + 1
+    customers = Customer.objects.bulk_create(
+        Customer(customer_id=first_customer_id + i, first_name=f'Bench{i}', last_name='Loans', age=30, phone_number=str(9000000000 + i),
+                 monthly_salary=Decimal('10000000'), approved_limit=Decimal('100000000'), current_debt=Decimal('0'))
+        for i in range(count)
+    )
+    first_loan_id = (Loan.objects.aggregate(last=Max('loan_id'))['last'] or 0) + 1
+    Loan.objects.bulk_create(
+        Loan(customer=customer, loan_id=first_loan_id + i * history + n, loan_amount=Decimal('10000'), tenure=12, interest_rate=12.0,
+             monthly_payment=Decimal('888.49'), emis_paid_on_time=12, start_date=date(2015, 1, 1), end_date=date(2016, 1, 1))
+        for i, customer in enumerate(customers) for n in range(history)
+    )
+    return customers
+
+
+def legacy_create(customer_id, loan_amount, interest_rate, tenure):
+    """The previous view: count() + 1 loan ids and a read-modify-write debt update."""
+    customer = Customer.objects.get(customer_id=customer_id)
+    loan = Loan.objects.create(customer=customer, loan_id=Loan.objects.count() + 1, loan_amount=loan_amount, tenure=tenure,
+                               interest_rate=interest_rate, monthly_payment=0, emis_paid_on_time=0,
+                               start_date=date.today(), end_date=date.today())
+    customer.current_debt = (customer.current_debt or 0) + Decimal(loan_amount)
+    customer.save()
+    return loan
+
+
+def hammer(create, customer_ids, workers, requests):
+    """Request loans for ``customer_ids`` in turn from ``workers`` threads; returns (created, failed, seconds)."""
+    def worker(n):
+        created, failed = 0, 0
+        try:
+            for i in range(requests):
+                try:
+                    created += bool(create(customer_ids[(n + i) % len(customer_ids)], LOAN_AMOUNT, 20, 12))
+                except IntegrityError:
+                    failed += 1
+        finally:
+            connection.close()
+        return created, failed
+    started = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        results = list(pool.map(worker, range(workers)))
+    return sum(r[0] for r in results), sum(r[1] for r in results), time.perf_counter() - started
@@ -0,0 +1,91 @@
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+
+from core.logs import JsonFormatter, QueueFileHandler, RequestIdFilter
+
+LOGGERS = ['django', 'api', 'api.requests']
+
+
+class SlowDisk:
+    """A log file whose flushes stall, like a saturated or network-backed disk."""
+
+    def __init__(self, stream, stall):
+        self.stream = stream
+        self.stall = stall
+
+    def write(self, text):
+        return self.stream.write(text)
+
+    def flush(self):
+        time.sleep(self.stall)
+        self.stream.flush()
+
+    def close(self):
+        self.stream.close()
+
+
+class Command(BaseCommand):
+    help = ('Request latency with the old synchronous FileHandler against the queued JSON handler, '
+            'while every flush of the log file stalls for --stall-ms.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--stall-ms', type=float, default=5)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ('sync', 'queued'):
+                filename = os.path.join(directory, f'{name}.log')
+                handler = self.handler(name, filename, options['stall_ms'] / 1000)
+                latencies, elapsed = self.run(handler, options['requests'])
+                with open(filename) as written:
+                    lines = sum(1 for _ in written)
+                percentiles = statistics.quantiles(latencies, n=100)
+                self.stdout.write(
+                    f'{name:<7} {len(latencies) / elapsed:>7.0f} req/s  p50 {percentiles[49] * 1e3:6.2f} ms  '
+                    f'p99 {percentiles[98] * 1e3:6.2f} ms  {lines} lines written'
+                )
+
+    @staticmethod
+    def handler(name, filename, stall):
+        if name == 'sync':
+            handler = logging.FileHandler(filename)
+            handler.setFormatter(logging.Formatter('{levelname} {asctime} {module} {message}', style='{'))
+            handler.stream = SlowDisk(handler.stream, stall)
+        else:
+            handler = QueueFileHandler(filename)
+            handler.setFormatter(JsonFormatter())
+            handler.addFilter(RequestIdFilter())
+            handler.target.stream = SlowDisk(handler.target._open(), stall)
+        return handler
+
+    @staticmethod
+    def run(handler, requests):
+        """Time ``requests`` GETs of the API root with ``handler`` as the only log output; closes the handler."""
+        loggers = [logging.getLogger(name) for name in LOGGERS]
+        saved = [logger.handlers for logger in loggers]
+        client = Client()
+        latencies = []
+        try:
+            for logger in loggers:
+                logger.handlers = [handler]
+            with override_settings(ALLOWED_HOSTS=['testserver'] + settings.ALLOWED_HOSTS):
+                started = time.perf_counter()
+                for _ in range(requests):
+                    sent = time.perf_counter()
+                    client.get('/api/v1/')
+                    latencies.append(time.perf_counter() - sent)
+                elapsed = time.perf_counter() - started
+        finally:
+            for logger, handlers in zip(loggers, saved):
+                logger.handlers = handlers
+            handler.close()
+        return latencies, elapsed
@@ -0,0 +1,104 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from core.models import CreditApplication, Customer, Loan, Transaction
+from core.renderers import FastJSONRenderer
+from core.representation import compile_representation
+from core.serializers import CreditApplicationSerializer, CustomerSerializer, LoanSerializer, TransactionSerializer
+
+SERIALIZERS = {
+    'customers': CustomerSerializer,
+    'loans': LoanSerializer,
+    'credit-applications': CreditApplicationSerializer,
+    'transactions': TransactionSerializer,
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Per-row cost of the ModelSerializer read path against the lean values() path, checking both render the same bytes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', choices=sorted(SERIALIZERS))
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--synthetic', action='store_true',
+                            help='Benchmark against generated rows inside a transaction that is rolled back.')
+
+    def handle(self, *args, **options):
+        if not options['synthetic']:
+            return self.benchmark(options)
+        try:
+            with transaction.atomic():
+                seed(options['rows'])
+                self.benchmark(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def benchmark(self, options):
+        serializer_class = SERIALIZERS[options['resource']]
+        representation = compile_representation(serializer_class)
+        queryset = serializer_class.Meta.model.objects.order_by('pk')[:options['rows']]
+        rows = len(queryset)
+        if not rows:
+            raise CommandError('No rows to benchmark; pass --synthetic to generate some')
+
+        def serializer_path():
+            return JSONRenderer().render(serializer_class(queryset.all(), many=True).data)
+
+        def lean_path():
+            return FastJSONRenderer().render([representation.convert(row) for row in queryset.values(*representation.columns)])
+
+        if serializer_path() != lean_path():
+            raise CommandError('Lean read path output differs from the serializer output')
+        timings = {}
+        for name, path in (('serializer', serializer_path), ('lean', lean_path)):
+            best = min(timed(path) for _ in range(options['repeat']))
+            timings[name] = best / rows * 1e6
+            self.stdout.write(f'{name:>10}: {timings[name]:7.2f} us/row ({rows} rows, query + serialize + render)')
+        self.stdout.write(self.style.SUCCESS(f'Identical output; lean path is {timings["serializer"] / timings["lean"]:.1f}x faster'))
+
+
+def timed(path):
+    started = time.perf_counter()
+    path()
+    return time.perf_counter() - started
+
+
+def seed(rows):
+    """Customers, loans, applications and transactions with nulls and uneven decimals."""
+    rng = random.Random(0)
+    customers = Customer.objects.bulk_create(
+        Customer(customer_id=10 ** 9 + i, first_name=f'Bench{i}', last_name='Ünicode', age=rng.choice([None, 25, 40]),
+                 phone_number=str(9000000000 + i), monthly_salary=Decimal(rng.randint(10000, 500000)),
+                 approved_limit=rng.choice([None, Decimal('1800000.50')]), current_debt=Decimal(rng.randint(0, 10 ** 6)) / 100)
+        for i in range(rows)
+    )
+    now = timezone.now()
+    Loan.objects.bulk_create(
+        Loan(customer=customers[i], loan_id=10 ** 9 + i, loan_amount=Decimal(rng.randint(100000, 10 ** 8)) / 100,
+             tenure=rng.randint(6, 360), interest_rate=rng.randint(800, 2000) / 100, monthly_payment=Decimal(rng.randint(1000, 10 ** 6)) / 100,
+             emis_paid_on_time=rng.randint(0, 12), start_date=date(2020, 1, 1) + timedelta(days=i % 900),
+             end_date=date(2024, 1, 1) + timedelta(days=i % 900), status=rng.choice(['pending', 'approved', 'rejected']))
+        for i in range(rows)
+    )
+    CreditApplication.objects.bulk_create(
+        CreditApplication(customer=customers[i], amount=Decimal(rng.randint(100, 10 ** 7)) / 100, status='pending',
+                          reviewed_at=rng.choice([None, now - timedelta(microseconds=rng.randint(0, 10 ** 12))]))
+        for i in range(rows)
+    )
+    Transaction.objects.bulk_create(
+        Transaction(customer=customers[i], amount=Decimal(rng.randint(-10 ** 6, 10 ** 6)) / 100, description=rng.choice(['', 'EMI', 'fee  ']))
+        for i in range(rows)
+    )
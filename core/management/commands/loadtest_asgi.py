@@ -0,0 +1,185 @@
+import asyncio
+import itertools
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.http import HttpRequest
+from django.middleware.csrf import get_token
+from django.test import Client
+
+from core.models import Loan
+
+SERVERS = {
+    'wsgi': ['-m', 'gunicorn', 'credit_system.wsgi:application', '--workers', '{workers}',
+             '--bind', '127.0.0.1:{port}', '--log-level', 'warning'],
+    'asgi': ['-m', 'uvicorn', 'credit_system.asgi:application', '--workers', '{workers}',
+             '--host', '127.0.0.1', '--port', '{port}', '--log-level', 'warning', '--no-access-log'],
+}
+SAMPLE_LOANS = 200
+STARTUP_TIMEOUT = 30
+
+
+class Command(BaseCommand):
+    help = ('Load-tests view-loan, view-loans, check-eligibility and profile under gunicorn (WSGI, sync views) '
+            'and uvicorn (ASGI, async views) with the same worker count, reporting throughput and p50/p99 latency.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[10, 50, 200],
+                            help='Concurrent keep-alive clients; one run per value.')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds of load per run.')
+        parser.add_argument('--servers', nargs='+', choices=sorted(SERVERS), default=['wsgi', 'asgi'])
+        parser.add_argument('--port', type=int, default=8765)
+
+    def handle(self, *args, **options):
+        loans = list(Loan.objects.values_list('loan_id', 'customer__customer_id')[:SAMPLE_LOANS])
+        if not loans:
+            raise CommandError('No loans to request; load some customers and loans first')
+        # A throwaway session user; the servers run with throttling off
+        user = User.objects.create_user(f'loadtest-{uuid.uuid4().hex[:12]}')
+        client = Client()
+        client.force_login(user)
+        session_key = client.cookies[settings.SESSION_COOKIE_NAME].value
+        try:
+            requests = request_mix(loans, session_key)
+            for server in options['servers']:
+                with running(server, options['workers'], options['port']):
+                    asyncio.run(load(options['port'], requests, max(options['concurrency']), 1))
+                    for concurrency in options['concurrency']:
+                        latencies, failures, elapsed = asyncio.run(load(options['port'], requests, concurrency, options['duration']))
+                        self.report(server, options['workers'], concurrency, latencies, failures, elapsed)
+        finally:
+            Session.objects.filter(session_key=session_key).delete()
+            user.delete()
+
+    def report(self, server, workers, concurrency, latencies, failures, elapsed):
+        if len(latencies) < 2:
+            self.stdout.write(self.style.ERROR(f'{server} x{workers} c={concurrency}: no responses ({failures} failed)'))
+            return
+        percentiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f'{server} x{workers} c={concurrency:<4} {len(latencies):>7} requests {failures:>5} failed '
+            f'{len(latencies) / elapsed:>8.0f} req/s  p50 {percentiles[49] * 1e3:7.1f} ms  p99 {percentiles[98] * 1e3:7.1f} ms'
+        )
+
+
+def request_mix(loans, session_key):
+    """Raw HTTP/1.1 requests cycling through the four endpoints for the sampled loans."""
+    csrf_request = HttpRequest()
+    csrf_token = get_token(csrf_request)
+    cookie = f'{settings.SESSION_COOKIE_NAME}={session_key}; {settings.CSRF_COOKIE_NAME}={csrf_request.META["CSRF_COOKIE"]}'
+    requests = []
+    for loan_id, customer_id in loans:
+        quote = json.dumps({'customer_id': customer_id, 'loan_amount': 100000, 'interest_rate': 12, 'tenure': 24}).encode()
+        requests += [
+            http_request('GET', f'/api/v1/view-loan/{loan_id}', cookie),
+            http_request('GET', f'/api/v1/view-loans/{customer_id}', cookie),
+            http_request('POST', '/api/v1/check-eligibility', cookie, quote,
+                         {'Content-Type': 'application/json', 'X-CSRFToken': csrf_token}),
+            http_request('GET', '/api/v1/profile/', cookie),
+        ]
+    return requests
+
+
+def http_request(method, path, cookie, body=b'', headers=None):
+    headers = {'Host': 'localhost', 'Cookie': cookie, 'Content-Length': str(len(body)), **(headers or {})}
+    head = f'{method} {path} HTTP/1.1\r\n' + ''.join(f'{name}: {value}\r\n' for name, value in headers.items())
+    return (head + '\r\n').encode('latin-1') + body
+
+
+@contextmanager
+def running(server, workers, port):
+    command = [sys.executable] + [part.format(workers=workers, port=port) for part in SERVERS[server]]
+    env = {**os.environ, 'USER_THROTTLE_RATE': '', 'ANON_THROTTLE_RATE': '', 'ASYNC_READ_VIEWS': '1' if server == 'asgi' else '0'}
+    process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env)
+    try:
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while True:
+            if process.poll() is not None:
+                raise CommandError(f'{server} server exited with status {process.returncode}')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise CommandError(f'{server} server did not start listening on port {port}')
+                time.sleep(0.2)
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+async def load(port, requests, concurrency, duration):
+    """Run ``concurrency`` clients for ``duration`` seconds; returns (latencies, failures, elapsed)."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+    latencies = []
+    failures = 0
+
+    async def client(offset):
+        nonlocal failures
+        connection = None
+        for n in itertools.count(offset, concurrency):
+            if loop.time() >= deadline:
+                break
+            started = time.perf_counter()
+            try:
+                if connection is None:
+                    connection = await asyncio.open_connection('127.0.0.1', port)
+                status, keep_alive = await exchange(*connection, requests[n % len(requests)])
+            except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                failures += 1
+                connection = close(connection)
+                await asyncio.sleep(0.01)
+                continue
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                failures += 1
+            if not keep_alive:
+                connection = close(connection)
+        close(connection)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(n) for n in range(concurrency)))
+    return latencies, failures, time.perf_counter() - started
+
+
+async def exchange(reader, writer, request):
+    """Send one request and read the whole response; returns (status, keep-alive)."""
+    writer.write(request)
+    await writer.drain()
+    lines = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = dict(line.lower().split(': ', 1) for line in lines[1:] if line)
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while size := int((await reader.readuntil(b'\r\n')).split(b';')[0], 16):
+            await reader.readexactly(size + 2)
+        await reader.readuntil(b'\r\n')
+    else:
+        await reader.read()
+        return status, False
+    return status, headers.get('connection') != 'close'
+
+
+def close(connection):
+    if connection is not None:
+        connection[1].close()
+    return None
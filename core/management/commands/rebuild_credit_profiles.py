@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core.credit_profile import DEFAULT_CHUNK_SIZE, rebuild_credit_profiles
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-customer credit profiles from the loan table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--customer', type=int, action='append', dest='customers',
+                            help='Customer primary key to rebuild (repeatable); default is all customers.')
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_credit_profiles(options['customers'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rebuilt} credit profiles'))
@@ -0,0 +1,36 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Customer, CustomerCreditScore
+from core.rescoring import DEFAULT_CHUNK_SIZE, rescore_portfolio
+from core.scoring import calculate_credit_score
+
+
+class Command(BaseCommand):
+    help = 'Recompute the credit score of every customer into CustomerCreditScore.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--verify', type=int, default=0, metavar='N',
+                            help='Check N random customers against the scalar calculate_credit_score.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rescored = rescore_portfolio(options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rescored {rescored} customers in {time.perf_counter() - started:.1f}s'))
+        if options['verify']:
+            self.verify(options['verify'])
+
+    def verify(self, sample_size):
+        pks = list(Customer.objects.values_list('pk', flat=True))
+        sample = random.sample(pks, min(sample_size, len(pks)))
+        scores = CustomerCreditScore.objects.select_related('customer').filter(customer__in=sample)
+        mismatches = [
+            stored for stored in scores
+            if stored.score != calculate_credit_score(list(stored.customer.loans.all()), stored.customer.approved_limit or 0)
+        ]
+        if mismatches:
+            raise CommandError(f'{len(mismatches)} of {len(sample)} scores differ from calculate_credit_score, e.g. customer {mismatches[0].customer_id}')
+        self.stdout.write(self.style.SUCCESS(f'Verified {len(sample)} scores against calculate_credit_score'))
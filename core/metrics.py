@@ -0,0 +1,180 @@
+"""Per-route request and per-task Celery timings with SQL counts, exported in Prometheus text format.
+
+Each process accumulates its own counters and publishes a snapshot to the
+cache every ``METRICS_FLUSH_INTERVAL`` seconds, in one of ``MAX_PROCESS_SLOTS``
+slots. The metrics endpoint sums the live slots, so every web and Celery
+worker sharing the cache is counted.
+"""
+import bisect
+import copy
+import os
+import socket
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Upper bounds (seconds) of the latency histogram buckets; tasks run far longer than requests
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+MAX_PROCESS_SLOTS = 256
+# Request methods kept as labels; anything else is counted as 'other'
+HTTP_METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS', 'TRACE', 'CONNECT'})
+
+# [query count, query seconds] of the request or task running in this context
+_query_stats = ContextVar('query_stats', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper adding each query to the current request or task."""
+    stats = _query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats[0] += 1
+        stats[1] += time.perf_counter() - started
+
+
+def instrument_connection(sender, connection, **kwargs):
+    """``connection_created`` receiver installing :func:`record_query` once per connection wrapper."""
+    if record_query not in connection.execute_wrappers:
+        # First, so execute_wrapper() blocks that are open now still pop their own wrapper
+        connection.execute_wrappers.insert(0, record_query)
+
+
+def start_timing():
+    """Begin counting queries in this context; pass the result to :meth:`MetricsRegistry.observe`."""
+    stats = [0, 0.0]
+    return _query_stats.set(stats), stats, time.perf_counter()
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.process = f'{socket.gethostname()}:{os.getpid()}'
+        self.series = {}
+        self.slot = None
+        self.flushed_at = time.monotonic()
+
+    def observe(self, key, outcome, timing):
+        """Record a finished request or task: ``key`` is its labels, ``timing`` what :func:`start_timing` returned."""
+        token, (queries, query_seconds), started = timing
+        seconds = time.perf_counter() - started
+        try:
+            _query_stats.reset(token)
+        except ValueError:
+            # A streamed response finished in a copy of the request's context (a worker thread under ASGI)
+            pass
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = {'buckets': [0] * (len(BUCKETS) + 1), 'sum': 0.0, 'queries': 0, 'query_seconds': 0.0, 'outcomes': {}}
+            series['buckets'][bisect.bisect_left(BUCKETS, seconds)] += 1
+            series['sum'] += seconds
+            series['queries'] += queries
+            series['query_seconds'] += query_seconds
+            series['outcomes'][outcome] = series['outcomes'].get(outcome, 0) + 1
+        if time.monotonic() - self.flushed_at >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """Publish this process's counters to its cache slot, claiming a free slot first if needed."""
+        self.flushed_at = time.monotonic()
+        with self.lock:
+            snapshot = {'process': self.process, 'series': copy.deepcopy(self.series)}
+        if self.slot is not None:
+            current = cache.get(slot_key(self.slot))
+            if current is None or current['process'] == self.process:
+                cache.set(slot_key(self.slot), snapshot, settings.METRICS_SNAPSHOT_TIMEOUT)
+                return
+        for slot in range(MAX_PROCESS_SLOTS):
+            if cache.add(slot_key(slot), snapshot, settings.METRICS_SNAPSHOT_TIMEOUT):
+                self.slot = slot
+                return
+
+    def reset(self):
+        self.__init__()
+
+
+registry = MetricsRegistry()
+# Forked workers start from zero instead of re-reporting their parent's counts
+os.register_at_fork(after_in_child=registry.reset)
+
+
+# Timings of the Celery tasks running in this process, by task id
+_task_timings = {}
+
+
+def start_task(task_id):
+    _task_timings[task_id] = start_timing()
+
+
+def finish_task(task_id, task_name, state):
+    timing = _task_timings.pop(task_id, None)
+    if timing is not None:
+        registry.observe(('task', task_name), state or 'UNKNOWN', timing)
+
+
+def slot_key(slot):
+    return f'metrics:slot:{slot}'
+
+
+def collect():
+    """Every live process's series, summed by key."""
+    registry.flush()
+    merged = {}
+    for snapshot in cache.get_many([slot_key(slot) for slot in range(MAX_PROCESS_SLOTS)]).values():
+        for key, series in snapshot['series'].items():
+            total = merged.get(key)
+            if total is None:
+                merged[key] = copy.deepcopy(series)
+                continue
+            total['buckets'] = [a + b for a, b in zip(total['buckets'], series['buckets'])]
+            for field in ('sum', 'queries', 'query_seconds'):
+                total[field] += series[field]
+            for outcome, count in series['outcomes'].items():
+                total['outcomes'][outcome] = total['outcomes'].get(outcome, 0) + count
+    return merged
+
+
+def _labels(**labels):
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+def _family(lines, name, kind, help_text, samples):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} {kind}')
+    lines.extend(f'{sample_name}{labels} {value}' for sample_name, labels, value in samples)
+
+
+def prometheus_text(merged):
+    """The Prometheus text exposition (format 0.0.4) of :func:`collect`'s series."""
+    lines = []
+    for kind, prefix, label_names, outcome_label, subject in (
+        ('http', 'credit_system_http_request', ('route', 'method'), 'status', 'request'),
+        ('task', 'credit_system_task', ('task',), 'state', 'task run'),
+    ):
+        series = sorted((key[1:], value) for key, value in merged.items() if key[0] == kind)
+        histogram, outcomes, queries, query_seconds = [], [], [], []
+        for key, value in series:
+            labels = dict(zip(label_names, key))
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ('+Inf',), value['buckets']):
+                cumulative += count
+                histogram.append((f'{prefix}_duration_seconds_bucket', _labels(**labels, le=bound), cumulative))
+            histogram.append((f'{prefix}_duration_seconds_sum', _labels(**labels), value['sum']))
+            histogram.append((f'{prefix}_duration_seconds_count', _labels(**labels), cumulative))
+            outcomes.extend((f'{prefix}s_total', _labels(**labels, **{outcome_label: outcome}), count)
+                            for outcome, count in sorted(value['outcomes'].items()))
+            queries.append((f'{prefix}_queries_total', _labels(**labels), value['queries']))
+            query_seconds.append((f'{prefix}_query_seconds_total', _labels(**labels), value['query_seconds']))
+        _family(lines, f'{prefix}_duration_seconds', 'histogram', f'Time per {subject}.', histogram)
+        _family(lines, f'{prefix}s_total', 'counter', f'{subject.capitalize()}s by {outcome_label}.', outcomes)
+        _family(lines, f'{prefix}_queries_total', 'counter', f'SQL queries run by {subject}s.', queries)
+        _family(lines, f'{prefix}_query_seconds_total', 'counter', f'Time spent in SQL queries by {subject}s.', query_seconds)
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,173 @@
+"""Middleware of the core app."""
+import logging
+import re
+import time
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+from .db_router import allow_replica_reads, reset_replica_reads
+from .logs import request_id
+from .metrics import HTTP_METHODS, registry, start_timing
+
+PRIMARY_PIN_COOKIE = 'db_primary_pin'
+REQUEST_ID_HEADER = 'X-Request-ID'
+# Ids passed in by a proxy or client are kept if they can't garble a log line
+CLIENT_REQUEST_ID = re.compile(r'[A-Za-z0-9._-]{1,64}')
+
+access_logger = logging.getLogger('api.requests')
+
+
+class RequestIdMiddleware:
+    """Give each request an id for its log records and ``X-Request-ID`` header, and log its latency.
+
+    The id is the incoming ``X-Request-ID`` when it looks safe, otherwise a new
+    one. The access record goes to the ``api.requests`` logger with ``method``,
+    ``path``, ``route``, ``status`` and ``latency_ms`` fields.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token, started = request_id.set(self.request_id(request)), time.perf_counter()
+        try:
+            response = self.get_response(request)
+            self.finish(request, response, started)
+        finally:
+            request_id.reset(token)
+        return response
+
+    async def __acall__(self, request):
+        token, started = request_id.set(self.request_id(request)), time.perf_counter()
+        try:
+            response = await self.get_response(request)
+            self.finish(request, response, started)
+        finally:
+            request_id.reset(token)
+        return response
+
+    @staticmethod
+    def request_id(request):
+        given = request.headers.get(REQUEST_ID_HEADER, '')
+        return given if CLIENT_REQUEST_ID.fullmatch(given) else uuid.uuid4().hex
+
+    @staticmethod
+    def finish(request, response, started):
+        response[REQUEST_ID_HEADER] = request_id.get()
+        if access_logger.isEnabledFor(logging.INFO):
+            route = request.resolver_match.view_name if request.resolver_match else None
+            access_logger.info('%s %s %s', request.method, request.path, response.status_code, extra={
+                'method': request.method, 'path': request.path, 'route': route, 'status': response.status_code,
+                'latency_ms': round((time.perf_counter() - started) * 1000, 3),
+            })
+
+
+class ReplicaRoutingMiddleware:
+    """Send the reads of safe requests to the replicas, unless the client wrote a moment ago.
+
+    Unsafe methods, and views with ``primary_reads = True``, read from the
+    primary. Unsafe requests also set a cookie that keeps the client's reads on
+    the primary for ``REPLICA_PIN_SECONDS``, so it sees its own writes whatever
+    the replica lag.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = allow_replica_reads(self.replica_allowed(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            reset_replica_reads(token)
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        token = allow_replica_reads(self.replica_allowed(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            reset_replica_reads(token)
+        return self.pin(request, response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if getattr(getattr(view_func, 'view_class', None), 'primary_reads', False):
+            allow_replica_reads(False)
+
+    @staticmethod
+    def replica_allowed(request):
+        return bool(settings.DATABASE_REPLICAS) and request.method in SAFE_METHODS and PRIMARY_PIN_COOKIE not in request.COOKIES
+
+    @staticmethod
+    def pin(request, response):
+        if settings.DATABASE_REPLICAS and request.method not in SAFE_METHODS:
+            response.set_cookie(PRIMARY_PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax')
+        return response
+
+
+class MetricsMiddleware:
+    """Time each request and count its SQL queries under its route name, for ``/api/v1/admin/metrics/``."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timing = start_timing()
+        response = self.get_response(request)
+        self.observe(request, response, timing)
+        return response
+
+    async def __acall__(self, request):
+        timing = start_timing()
+        response = await self.get_response(request)
+        self.observe(request, response, timing)
+        return response
+
+    @staticmethod
+    def observe(request, response, timing):
+        route = request.resolver_match.view_name if request.resolver_match else 'unmatched'
+        # Any method a client makes up would otherwise become a series of its own
+        key = ('http', route, request.method if request.method in HTTP_METHODS else 'other')
+        if not response.streaming:
+            registry.observe(key, response.status_code, timing)
+            return
+        # Streamed bodies (the exports) run their queries as they are sent, so they are recorded once sent or closed
+        content = response.streaming_content
+        record = lambda: registry.observe(key, response.status_code, timing)
+        response.streaming_content = observed_async(content, record) if response.is_async else observed(content, record)
+
+
+def observed(content, record):
+    try:
+        yield from content
+    finally:
+        record()
+
+
+async def observed_async(content, record):
+    try:
+        async for chunk in content:
+            yield chunk
+    finally:
+        record()
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_ingestioncheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerFingerprint',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fingerprint', serialize=False, to='core.customer')),
+                ('digest', models.BigIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LoanFingerprint',
+            fields=[
+                ('loan', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fingerprint', serialize=False, to='core.loan')),
+                ('digest', models.BigIntegerField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_fingerprints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerCreditProfile',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='credit_profile', serialize=False, to='core.customer')),
+                ('total_emis', models.BigIntegerField(default=0)),
+                ('emis_paid_on_time', models.BigIntegerField(default=0)),
+                ('loan_count', models.IntegerField(default=0)),
+                ('current_year_loan_count', models.IntegerField(default=0)),
+                ('total_volume', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('active_debt', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('active_emi_sum', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('active_until', models.DateField(blank=True, null=True)),
+                ('computed_on', models.DateField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_customercreditprofile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerCreditScore',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='credit_score', serialize=False, to='core.customer')),
+                ('score', models.FloatField()),
+                ('computed_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_idsequence'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='creditapplication',
+            index=models.Index(fields=['status', 'submitted_at'], name='application_status_sub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='creditapplication',
+            index=models.Index(fields=['submitted_at'], name='application_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['customer', 'end_date'], name='loan_customer_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['status'], name='loan_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['loan_id'], name='loan_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['loan_amount'], name='loan_amount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['interest_rate'], name='loan_interest_rate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['tenure'], name='loan_tenure_idx'),
+        ),
+        # Drop the single-column FK index only once loan_customer_end_idx covers it
+        migrations.AlterField(
+            model_name='loan',
+            name='customer',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='loans', to='core.customer'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanStatusCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=10)),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('status', 'shard')},
+            },
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:15
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+# Name search indexes (see core.search). PostgreSQL gets trigram GIN indexes on the
+# UPPER(col::text) expressions Django emits for icontains. SQLite gets an FTS5 trigram
+# table over the same columns, kept in step by triggers. A future migration that
+# rebuilds core_customer on SQLite has to recreate the triggers.
+POSTGRESQL_SEARCH = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX customer_first_name_trgm_idx ON core_customer USING gin (UPPER(first_name::text) gin_trgm_ops)',
+    'CREATE INDEX customer_last_name_trgm_idx ON core_customer USING gin (UPPER(last_name::text) gin_trgm_ops)',
+]
+POSTGRESQL_SEARCH_REVERSE = [
+    'DROP INDEX IF EXISTS customer_first_name_trgm_idx',
+    'DROP INDEX IF EXISTS customer_last_name_trgm_idx',
+]
+SQLITE_SEARCH = [
+    "CREATE VIRTUAL TABLE core_customer_fts USING fts5("
+    "first_name, last_name, content='core_customer', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER core_customer_fts_insert AFTER INSERT ON core_customer BEGIN "
+    "INSERT INTO core_customer_fts (rowid, first_name, last_name) VALUES (new.id, new.first_name, new.last_name); END",
+    "CREATE TRIGGER core_customer_fts_delete AFTER DELETE ON core_customer BEGIN "
+    "INSERT INTO core_customer_fts (core_customer_fts, rowid, first_name, last_name) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name); END",
+    "CREATE TRIGGER core_customer_fts_update AFTER UPDATE OF first_name, last_name ON core_customer BEGIN "
+    "INSERT INTO core_customer_fts (core_customer_fts, rowid, first_name, last_name) "
+    "VALUES ('delete', old.id, old.first_name, old.last_name); "
+    "INSERT INTO core_customer_fts (rowid, first_name, last_name) VALUES (new.id, new.first_name, new.last_name); END",
+    "INSERT INTO core_customer_fts (core_customer_fts) VALUES ('rebuild')",
+]
+SQLITE_SEARCH_REVERSE = [
+    'DROP TRIGGER IF EXISTS core_customer_fts_insert',
+    'DROP TRIGGER IF EXISTS core_customer_fts_delete',
+    'DROP TRIGGER IF EXISTS core_customer_fts_update',
+    'DROP TABLE IF EXISTS core_customer_fts',
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement, params=None)
+    return run
+
+
+create_name_search = _run({'postgresql': POSTGRESQL_SEARCH, 'sqlite': SQLITE_SEARCH})
+drop_name_search = _run({'postgresql': POSTGRESQL_SEARCH_REVERSE, 'sqlite': SQLITE_SEARCH_REVERSE})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_loanstatuscounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='phone_digits',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Replace(django.db.models.functions.text.Replace(django.db.models.functions.text.Replace(django.db.models.functions.text.Replace(django.db.models.functions.text.Replace(django.db.models.functions.text.Replace('phone_number', models.Value(' '), models.Value('')), models.Value('-'), models.Value('')), models.Value('+'), models.Value('')), models.Value('('), models.Value('')), models.Value(')'), models.Value('')), models.Value('.'), models.Value('')), output_field=models.CharField(max_length=15)),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['phone_digits'], name='customer_phone_digits_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(create_name_search, drop_name_search),
+    ]
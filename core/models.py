@@ -1,7 +1,19 @@
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Replace
 
 # Create your models here.
 
+# Punctuation people type in phone numbers; phone_digits drops it so prefix lookups can use an index
+PHONE_SEPARATORS = ' -+().'
+
+
+def _without(expression, characters):
+    for character in characters:
+        expression = Replace(expression, Value(character), Value(''))
+    return expression
+
+
 class Customer(models.Model):
     customer_id = models.IntegerField(unique=True)
     first_name = models.CharField(max_length=100)
@@ -12,6 +24,18 @@ class Customer(models.Model):
     approved_limit = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
     current_debt = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    phone_digits = models.GeneratedField(
+        expression=_without('phone_number', PHONE_SEPARATORS),
+        output_field=models.CharField(max_length=15),
+        db_persist=True,
+    )
+
+    class Meta:
+        indexes = [
+            # Phone-prefix search (core.search); the opclass only applies on PostgreSQL, for LIKE 'prefix%'.
+            # Name search indexes are backend-specific, see migration 0010
+            models.Index(fields=['phone_digits'], name='customer_phone_digits_idx', opclasses=['varchar_pattern_ops']),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
@@ -28,6 +52,13 @@ class CreditApplication(models.Model):
     submitted_at = models.DateTimeField(auto_now_add=True)
     reviewed_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Review queues: filter by status, newest first
+            models.Index(fields=['status', 'submitted_at'], name='application_status_sub_idx'),
+            models.Index(fields=['submitted_at'], name='application_submitted_idx'),
+        ]
+
     def __str__(self):
         return f"{self.customer.name} - {self.amount} ({self.status})"
 
@@ -41,7 +72,8 @@ class Transaction(models.Model):
         return f"{self.customer.name} - {self.amount} on {self.timestamp}"
 
 class Loan(models.Model):
-    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='loans')
+    # Indexed through loan_customer_end_idx, which leads with customer
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='loans', db_index=False)
     loan_id = models.IntegerField(unique=True)
     loan_amount = models.DecimalField(max_digits=12, decimal_places=2)
     tenure = models.IntegerField()
@@ -56,5 +88,102 @@ class Loan(models.Model):
         default='pending'
     )
 
+    class Meta:
+        indexes = [
+            # Per-customer loan lists and the active-loan aggregates behind eligibility
+            models.Index(fields=['customer', 'end_date'], name='loan_customer_end_idx'),
+            models.Index(fields=['status'], name='loan_status_idx'),
+            # Pending loans are the small slice the admins work through
+            models.Index(fields=['loan_id'], condition=models.Q(status='pending'), name='loan_pending_idx'),
+            # LoanViewSet filters and orderings
+            models.Index(fields=['loan_amount'], name='loan_amount_idx'),
+            models.Index(fields=['interest_rate'], name='loan_interest_rate_idx'),
+            models.Index(fields=['tenure'], name='loan_tenure_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status and owner so a save can move counters and cache stamps
+        instance._loaded_status = instance.__dict__.get('status')
+        instance._loaded_customer_id = instance.__dict__.get('customer_id')
+        return instance
+
     def __str__(self):
         return f"Loan {self.loan_id} for {self.customer.first_name} {self.customer.last_name}"
+
+class IngestionCheckpoint(models.Model):
+    job_id = models.CharField(max_length=64)
+    stage = models.CharField(max_length=20)
+    rows_committed = models.BigIntegerField(default=0)
+    completed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('job_id', 'stage')
+
+    def __str__(self):
+        return f"{self.job_id} {self.stage}: {self.rows_committed} rows"
+
+class CustomerFingerprint(models.Model):
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, primary_key=True, related_name='fingerprint')
+    digest = models.BigIntegerField()
+
+    def __str__(self):
+        return f"Customer {self.customer_id}: {self.digest}"
+
+class LoanFingerprint(models.Model):
+    loan = models.OneToOneField(Loan, on_delete=models.CASCADE, primary_key=True, related_name='fingerprint')
+    digest = models.BigIntegerField()
+
+    def __str__(self):
+        return f"Loan {self.loan_id}: {self.digest}"
+
+class CustomerCreditProfile(models.Model):
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, primary_key=True, related_name='credit_profile')
+    total_emis = models.BigIntegerField(default=0)
+    emis_paid_on_time = models.BigIntegerField(default=0)
+    loan_count = models.IntegerField(default=0)
+    current_year_loan_count = models.IntegerField(default=0)
+    total_volume = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    active_debt = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    active_emi_sum = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    # Earliest end_date among active loans; the profile goes stale the day after
+    active_until = models.DateField(null=True, blank=True)
+    computed_on = models.DateField()
+
+    def is_current(self, today):
+        """Whether the aggregates still hold on ``today`` (same year, no active loan ended)."""
+        if self.computed_on.year != today.year or self.computed_on > today:
+            return False
+        return self.active_until is None or today <= self.active_until
+
+    def __str__(self):
+        return f"Credit profile of customer {self.customer_id}"
+
+class CustomerCreditScore(models.Model):
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, primary_key=True, related_name='credit_score')
+    score = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Customer {self.customer_id}: {self.score:.2f}"
+
+class IdSequence(models.Model):
+    name = models.CharField(max_length=50, primary_key=True)
+    next_value = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.name}: next {self.next_value}"
+
+class LoanStatusCounter(models.Model):
+    # Each status is spread over a few shard rows so concurrent loan writes don't queue on one row
+    status = models.CharField(max_length=10)
+    shard = models.PositiveSmallIntegerField()
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('status', 'shard')
+
+    def __str__(self):
+        return f"{self.status}[{self.shard}]: {self.count}"
@@ -0,0 +1,162 @@
+"""Opt-in keyset pagination for the core ViewSets."""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    """Page numbers by default; ``?pagination=keyset`` switches to keyset pages.
+
+    Keyset pages follow the queryset's ordering (e.g. from ``?ordering=``) with
+    the primary key as tiebreaker, so each page is an index range scan rather
+    than an OFFSET, and no COUNT is run. Nullable keys sort last. ``next`` and
+    ``previous`` carry opaque cursors that are only valid for the same ordering.
+    """
+    mode_query_param = 'pagination'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    @classmethod
+    def requested(cls, request):
+        """Whether ``request`` asks for keyset pages."""
+        return cls.cursor_query_param in request.query_params or request.query_params.get(cls.mode_query_param) == 'keyset'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.requested(request)
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.keys = self.ordering_keys(queryset)
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor['reverse']
+        keys = [(field, not descending, not nulls_last) for field, descending, nulls_last in self.keys] if reverse else self.keys
+        queryset = queryset.order_by(*(self.order_expression(*key) for key in keys))
+        if cursor is not None:
+            queryset = queryset.filter(self.after(keys, cursor['values']))
+        rows = list(queryset[:self.page_size + 1])
+        more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, more
+        else:
+            self.has_next, self.has_previous = more, cursor is not None
+        self.rows = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next or not self.rows:
+            return None
+        return self.cursor_link(self.rows[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not self.has_previous or not self.rows:
+            return None
+        return self.cursor_link(self.rows[0], reverse=True)
+
+    def ordering_keys(self, queryset):
+        """(field, descending, nulls_last) for each ordering term, ending with the primary key."""
+        meta = queryset.model._meta
+        keys = []
+        for term in queryset.query.order_by:
+            if not isinstance(term, str) or term.lstrip('-') == '?':
+                raise NotFound('Keyset pagination needs plain field ordering')
+            name = term.lstrip('-')
+            try:
+                field = meta.pk if name == 'pk' else meta.get_field(name)
+            except FieldDoesNotExist:
+                raise NotFound('Keyset pagination needs plain field ordering')
+            keys.append((field, term.startswith('-'), field.null))
+            if field.primary_key:
+                return keys
+        # The tiebreaker runs in the same direction as the last ordering term
+        keys.append((meta.pk, keys[-1][1] if keys else False, False))
+        return keys
+
+    @staticmethod
+    def order_expression(field, descending, nulls_last):
+        expression = F(field.attname)
+        if not field.null:
+            return expression.desc() if descending else expression.asc()
+        if descending:
+            return expression.desc(nulls_last=True) if nulls_last else expression.desc(nulls_first=True)
+        return expression.asc(nulls_last=True) if nulls_last else expression.asc(nulls_first=True)
+
+    @staticmethod
+    def after(keys, values):
+        """Rows strictly after ``values`` in the order given by ``keys``."""
+        condition = None
+        for (field, descending, nulls_last), value in reversed(list(zip(keys, values))):
+            name = field.attname
+            if value is None:
+                beyond = None if nulls_last else Q(**{f'{name}__isnull': False})
+                equal = Q(**{f'{name}__isnull': True})
+            else:
+                beyond = Q(**{f'{name}__{"lt" if descending else "gt"}': value})
+                if field.null and nulls_last:
+                    beyond |= Q(**{f'{name}__isnull': True})
+                equal = Q(**{name: value})
+            tail = equal & condition if condition is not None else None
+            condition = beyond | tail if beyond is not None and tail is not None else beyond or tail
+        field, descending, _ = keys[0]
+        if not field.null:
+            # Redundant bound on the leading key so the planner can range-scan its index
+            condition &= Q(**{f'{field.attname}__{"lte" if descending else "gte"}': values[0]})
+        return condition
+
+    def signature(self):
+        return [('-' if descending else '') + field.attname for field, descending, _ in self.keys]
+
+    def cursor_link(self, row, reverse):
+        values = []
+        for field, _, _ in self.keys:
+            value = row[field.attname] if isinstance(row, dict) else getattr(row, field.attname)
+            values.append(None if value is None else self.encode_value(value))
+        payload = json.dumps({'o': self.signature(), 'v': values, 'r': reverse}, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+        url = remove_query_param(self.request.build_absolute_uri(), self.mode_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    @staticmethod
+    def encode_value(value):
+        if isinstance(value, (int, float, str, bool)):
+            return value
+        return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+            if payload['o'] != self.signature() or len(payload['v']) != len(self.keys):
+                raise ValueError(payload)
+            values = [None if value is None else field.to_python(value) for (field, _, _), value in zip(self.keys, payload['v'])]
+            # Within the column's range too, so a forged value can't reach the database as an overflow
+            for (field, _, _), value in zip(self.keys, values):
+                if value is not None:
+                    field.run_validators(value)
+            return {'values': values, 'reverse': bool(payload['r'])}
+        except (binascii.Error, ValueError, KeyError, TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
@@ -0,0 +1,57 @@
+"""Installment quoting backed by precomputed annuity factors.
+
+The table stores ``(r, (1 + r) ** n)`` per (rate, tenure) rather than a
+combined factor, so ``emi`` evaluates the exact expression ``calculate_emi``
+always has and returns identical rounded values.
+"""
+import math
+from functools import lru_cache
+
+# Common quote grid: 0-30% in quarter-point steps; 1-120 months, then whole years to 30
+GRID_RATES = [step / 4 for step in range(0, 30 * 4 + 1)]
+GRID_TENURES = list(range(1, 121)) + list(range(132, 361, 12))
+OFF_GRID_CACHE_SIZE = 4096
+
+
+def annuity_terms(rate, tenure):
+    """Monthly rate and compound growth factor for an annual ``rate`` in percent."""
+    r = (rate / 12) / 100
+    return r, math.pow(1 + r, tenure)
+
+
+class AnnuityFactorCache:
+    """Grid table plus a bounded LRU for (rate, tenure) pairs off the grid."""
+
+    def __init__(self, rates=GRID_RATES, tenures=GRID_TENURES, maxsize=OFF_GRID_CACHE_SIZE):
+        self.table = {(rate, tenure): annuity_terms(rate, tenure) for rate in rates for tenure in tenures}
+        self.off_grid = lru_cache(maxsize=maxsize)(annuity_terms)
+        self.grid_hits = 0
+
+    def terms(self, rate, tenure):
+        terms = self.table.get((rate, tenure))
+        if terms is None:
+            return self.off_grid(rate, tenure)
+        self.grid_hits += 1
+        return terms
+
+    def emi(self, principal, rate, tenure):
+        r, growth = self.terms(rate, tenure)
+        if r > 0:
+            emi = principal * r * growth / (growth - 1)
+        else:
+            emi = principal / tenure
+        return round(emi, 2)
+
+    def stats(self):
+        info = self.off_grid.cache_info()
+        return {
+            'grid_size': len(self.table),
+            'grid_hits': self.grid_hits,
+            'cache_hits': info.hits,
+            'cache_misses': info.misses,
+            'cache_size': info.currsize,
+            'cache_maxsize': info.maxsize,
+        }
+
+
+annuity_factors = AnnuityFactorCache()
@@ -0,0 +1,85 @@
+"""Bounded-memory readers for customer and loan extracts (.xlsx, .csv, .ndjson)."""
+import json
+import os
+from itertools import islice
+
+import pandas as pd
+from openpyxl import load_workbook
+
+SUPPORTED_EXTENSIONS = ('.xlsx', '.csv', '.ndjson', '.jsonl')
+
+
+def _extension(path):
+    extension = os.path.splitext(str(path))[1].lower()
+    if extension not in SUPPORTED_EXTENSIONS:
+        raise ValueError(f'Unsupported ingestion file type: {path}')
+    return extension
+
+
+def _window(rows, skip_rows, max_rows):
+    return islice(rows, skip_rows, None if max_rows is None else skip_rows + max_rows)
+
+
+def _xlsx_rows(workbook):
+    rows = workbook.active.iter_rows(values_only=True)
+    return next(rows, None), rows
+
+
+def _xlsx_batches(path, batch_size, skip_rows, max_rows):
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        header, rows = _xlsx_rows(workbook)
+        if header is None:
+            return
+        rows = _window(rows, skip_rows, max_rows)
+        while batch := list(islice(rows, batch_size)):
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
+
+
+def _csv_batches(path, batch_size, skip_rows, max_rows):
+    # Keep the header line (row 0) and drop the first skip_rows data rows
+    skip = (lambda line: 0 < line <= skip_rows) if skip_rows else None
+    yield from pd.read_csv(path, chunksize=batch_size, skiprows=skip, nrows=max_rows)
+
+
+def _ndjson_lines(handle):
+    return (line for line in handle if line.strip())
+
+
+def _ndjson_batches(path, batch_size, skip_rows, max_rows):
+    with open(path, encoding='utf-8') as handle:
+        lines = _window(_ndjson_lines(handle), skip_rows, max_rows)
+        while batch := list(islice(lines, batch_size)):
+            yield pd.DataFrame([json.loads(line) for line in batch])
+
+
+def iter_batches(path, batch_size, skip_rows=0, max_rows=None):
+    """Yield DataFrames of at most ``batch_size`` data rows.
+
+    ``skip_rows`` and ``max_rows`` select a window of data rows, so a file can
+    be resumed part-way or split into row ranges.
+    """
+    extension = _extension(path)
+    if extension == '.xlsx':
+        return _xlsx_batches(path, batch_size, skip_rows, max_rows)
+    if extension == '.csv':
+        return _csv_batches(path, batch_size, skip_rows, max_rows)
+    return _ndjson_batches(path, batch_size, skip_rows, max_rows)
+
+
+def count_rows(path):
+    """Number of data rows in ``path``, read without holding the file in memory."""
+    extension = _extension(path)
+    if extension == '.xlsx':
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            header, rows = _xlsx_rows(workbook)
+            return sum(1 for _ in rows) if header is not None else 0
+        finally:
+            workbook.close()
+    if extension == '.csv':
+        return sum(len(chunk) for chunk in pd.read_csv(path, usecols=[0], chunksize=100000))
+    with open(path, encoding='utf-8') as handle:
+        return sum(1 for _ in _ndjson_lines(handle))
@@ -0,0 +1,38 @@
+import json
+
+from rest_framework import renderers
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils import encoders
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """JSONRenderer with the same bytes, from one reused encoder without circular-reference checks."""
+    encoder = encoders.JSONEncoder(
+        ensure_ascii=renderers.JSONRenderer.ensure_ascii,
+        allow_nan=not renderers.JSONRenderer.strict,
+        separators=renderers.SHORT_SEPARATORS if renderers.JSONRenderer.compact else renderers.LONG_SEPARATORS,
+        check_circular=False,
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Pretty-printed output (e.g. the browsable API) keeps the stock path
+        if data is None or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return self.encoder.encode(data).replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode()
+
+
+class NDJSONRenderer(BaseRenderer):
+    """One JSON document per line; lists render one line per item."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        items = data if isinstance(data, list) else [data]
+        return ''.join(ndjson_line(item) for item in items).encode(self.charset)
+
+
+def ndjson_line(item):
+    return json.dumps(item, ensure_ascii=False, separators=(',', ':')) + '\n'
@@ -0,0 +1,117 @@
+"""Lean read path: serializer-identical representations built from ``values()`` rows."""
+import decimal
+from functools import cache
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.generics import get_object_or_404
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.response import Response
+from rest_framework.settings import ISO_8601, api_settings
+
+
+def _decimal(field):
+    # Mirrors DecimalField.quantize and its '{:f}' output, with the context built once
+    context = decimal.getcontext().copy()
+    context.prec = field.max_digits
+    quantum = decimal.Decimal('.1') ** field.decimal_places
+    return lambda value: f'{value.quantize(quantum, rounding=field.rounding, context=context):f}'
+
+
+def _datetime(value):
+    value = value.astimezone(timezone.get_current_timezone()) if timezone.is_aware(value) else timezone.make_aware(value)
+    value = value.isoformat()
+    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+
+def _date(value):
+    return value.isoformat()
+
+
+def field_converter(field):
+    """Fast equivalent of ``field.to_representation`` for a non-null DB value; None means pass-through."""
+    kind = type(field)
+    if kind is serializers.DecimalField and field.decimal_places is not None and field.max_digits is not None \
+            and getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING) \
+            and not field.localize and not field.normalize_output:
+        return _decimal(field)
+    if kind is serializers.DateTimeField and getattr(field, 'format', api_settings.DATETIME_FORMAT) == ISO_8601 \
+            and getattr(field, 'timezone', None) is None and settings.USE_TZ:
+        return _datetime
+    if kind is serializers.DateField and getattr(field, 'format', api_settings.DATE_FORMAT) == ISO_8601:
+        return _date
+    if kind is serializers.FloatField:
+        return float
+    if kind in (serializers.IntegerField, serializers.CharField, serializers.BooleanField):
+        return None
+    if kind is serializers.BigIntegerField:
+        return str if getattr(field, 'coerce_to_string', api_settings.COERCE_BIGINT_TO_STRING) else None
+    if kind is serializers.ChoiceField and all(key == str(value) for key, value in field.choice_strings_to_values.items()):
+        return None
+    if kind is PrimaryKeyRelatedField and field.pk_field is None:
+        return None
+    return field.to_representation
+
+
+class Representation:
+    """Precompiled (name, column, converter) triples for one ModelSerializer."""
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.columns = [column for _, column, _ in fields]
+
+    def convert(self, row):
+        return {
+            name: value if value is None or convert is None else convert(value)
+            for name, column, convert in self.fields
+            for value in (row[column],)
+        }
+
+
+@cache
+def compile_representation(serializer_class):
+    """Representation for ``serializer_class``, or None if a field isn't a plain model column."""
+    serializer = serializer_class()
+    model = serializer.Meta.model
+    fields = []
+    for field in serializer._readable_fields:
+        if isinstance(field, serializers.BaseSerializer) or field.source == '*' or '.' in field.source:
+            return None
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete or model_field.many_to_many:
+            return None
+        fields.append((field.field_name, model_field.attname, field_converter(field)))
+    return Representation(fields)
+
+
+class LeanReadMixin:
+    """ModelViewSet list/retrieve from ``values()`` rows, skipping model and serializer instances.
+
+    Responses match the serializer's byte for byte. Object permissions are
+    checked against the row dict.
+    """
+
+    def list(self, request, *args, **kwargs):
+        representation = compile_representation(self.get_serializer_class())
+        if representation is None:
+            return super().list(request, *args, **kwargs)
+        rows = self.filter_queryset(self.get_queryset()).values(*representation.columns)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response([representation.convert(row) for row in page])
+        return Response([representation.convert(row) for row in rows])
+
+    def retrieve(self, request, *args, **kwargs):
+        representation = compile_representation(self.get_serializer_class())
+        if representation is None:
+            return super().retrieve(request, *args, **kwargs)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        rows = self.filter_queryset(self.get_queryset()).values(*representation.columns)
+        row = get_object_or_404(rows, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        self.check_object_permissions(request, row)
+        return Response(representation.convert(row))
@@ -0,0 +1,105 @@
+"""Credit score, approval and EMI rules shared by the API views and batch jobs."""
+from django.utils import timezone
+from .quoting import annuity_factors
+
+# --- Modern Credit Score Logic Helpers ---
+CREDIT_SCORE_WEIGHTS = {
+    'on_time': 40,
+    'num_loans': 15,
+    'current_year': 15,
+    'volume': 20,
+}
+APPROVAL_THRESHOLDS = [
+    (50, 0),    # >50, any interest rate
+    (30, 12),   # 30-50, >12%
+    (10, 16),   # 10-30, >16%
+    (0, None),  # <10, not approved
+]
+
+def score_from_aggregates(total_emis, total_paid_on_time, num_loans, current_year_loans, total_loan_volume, approved_limit):
+    """Credit score from the loan-history aggregates."""
+    # 1. Past loans paid on time
+    on_time_ratio = (total_paid_on_time / total_emis) if total_emis else 1
+    score_on_time = on_time_ratio * CREDIT_SCORE_WEIGHTS['on_time']
+    # 2. Number of loans taken in past
+    score_num_loans = min(num_loans, 10) / 10 * CREDIT_SCORE_WEIGHTS['num_loans']
+    # 3. Loan activity in current year
+    score_current_year = min(current_year_loans, 5) / 5 * CREDIT_SCORE_WEIGHTS['current_year']
+    # 4. Loan approved volume
+    score_volume = min(float(total_loan_volume) / float(approved_limit), 1) * CREDIT_SCORE_WEIGHTS['volume'] if approved_limit else 0
+    return score_on_time + score_num_loans + score_current_year + score_volume
+
+def calculate_credit_score(loans, approved_limit):
+    """Calculate credit score based on loan history."""
+    current_year = timezone.now().date().year
+    return score_from_aggregates(
+        sum(l.tenure for l in loans),
+        sum(l.emis_paid_on_time for l in loans),
+        len(loans),
+        len([l for l in loans if l.start_date.year == current_year]),
+        sum(l.loan_amount for l in loans),
+        approved_limit,
+    )
+
+def calculate_profile_score(profile, approved_limit):
+    """Calculate credit score from a maintained CustomerCreditProfile."""
+    return score_from_aggregates(
+        profile.total_emis,
+        profile.emis_paid_on_time,
+        profile.loan_count,
+        profile.current_year_loan_count,
+        profile.total_volume,
+        approved_limit,
+    )
+
+def get_approval_and_rate(credit_score, interest_rate):
+    """Determine approval and corrected interest rate based on score."""
+    for threshold, min_rate in APPROVAL_THRESHOLDS:
+        if credit_score > threshold:
+            if min_rate is None:
+                return False, 16  # Not approved, lowest slab
+            if min_rate == 0 or interest_rate > min_rate:
+                return True, interest_rate if interest_rate >= min_rate else min_rate
+            else:
+                return False, min_rate
+    return False, 16
+
+def calculate_emi(principal, rate, tenure):
+    """Calculate EMI using compound interest formula, with cached annuity factors."""
+    return annuity_factors.emi(principal, rate, tenure)
+
+
+def check_eligibility(customer, profile, customer_id, loan_amount, interest_rate, tenure):
+    """Eligibility decision for one quote, from the customer and its credit profile."""
+    # Check if current debt exceeds approved limit
+    if profile.active_debt > (customer.approved_limit or 0):
+        credit_score = 0
+    else:
+        credit_score = calculate_profile_score(profile, customer.approved_limit or 0)
+    # Check if EMIs exceed 50% of salary
+    current_emis = float(profile.active_emi_sum)
+    new_emi = calculate_emi(loan_amount, interest_rate, tenure)
+    if customer.monthly_salary and (current_emis + new_emi) > 0.5 * float(customer.monthly_salary):
+        return {
+            'customer_id': customer_id,
+            'approval': False,
+            'interest_rate': interest_rate,
+            'corrected_interest_rate': interest_rate,
+            'tenure': tenure,
+            'monthly_installment': new_emi,
+            'reason': 'EMIs exceed 50% of monthly salary'
+        }
+    # Approval logic
+    approval, corrected_interest_rate = get_approval_and_rate(credit_score, interest_rate)
+    corrected_emi = calculate_emi(loan_amount, corrected_interest_rate, tenure)
+    response = {
+        'customer_id': customer_id,
+        'approval': approval,
+        'interest_rate': interest_rate,
+        'corrected_interest_rate': corrected_interest_rate,
+        'tenure': tenure,
+        'monthly_installment': corrected_emi,
+    }
+    if not approval:
+        response['reason'] = 'Loan not approved by policy'
+    return response
@@ -0,0 +1,76 @@
+"""Indexed customer search: name substrings and normalized phone prefixes, ranked by relevance."""
+import operator
+import re
+from functools import reduce
+
+from django.db import connections
+from django.db.models import Case, Q, Value, When
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+from .models import PHONE_SEPARATORS
+from .pagination import KeysetPagination
+
+PHONE_QUERY = re.compile(r'[\d%s]+' % re.escape(PHONE_SEPARATORS))
+# FTS5's trigram tokenizer can only match terms of at least three characters
+FTS_MIN_TERM = 3
+
+
+class CustomerSearchFilter(filters.SearchFilter):
+    """``?search=`` over customer names and phone numbers, served from indexes instead of icontains scans.
+
+    A query made only of digits and phone punctuation (``+91 98765``) is a
+    prefix of the customer's ``phone_digits``. Otherwise every term must appear
+    in the first or last name. PostgreSQL uses trigram GIN indexes for this and
+    SQLite uses an FTS5 trigram table. Matches are ordered by relevance (exact,
+    then prefix, then substring) unless ``ordering`` is given or keyset pages
+    are requested.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        vendor = connections[queryset.db].vendor
+        digits = re.sub(r'\D', '', query)
+        if digits and PHONE_QUERY.fullmatch(query):
+            queryset = queryset.filter(self.phone_filter(digits, vendor))
+            rank = Case(When(phone_digits=digits, then=Value(1)), default=Value(0))
+        else:
+            terms = self.get_search_terms(request)
+            if not terms:
+                return queryset
+            queryset = queryset.filter(self.name_filter(terms, vendor))
+            rank = reduce(operator.add, (self.name_rank(term) for term in terms))
+        if KeysetPagination.requested(request):
+            # Keyset pages need a plain field ordering
+            return queryset
+        return queryset.alias(search_rank=rank).order_by('-search_rank', 'pk')
+
+    @staticmethod
+    def phone_filter(digits, vendor):
+        if vendor == 'postgresql':
+            # LIKE 'prefix%' over the varchar_pattern_ops index, whatever the collation
+            return Q(phone_digits__startswith=digits)
+        # SQLite's LIKE can't use an index, but a binary-collation range can
+        return Q(phone_digits__gte=digits, phone_digits__lt=digits[:-1] + chr(ord(digits[-1]) + 1))
+
+    @staticmethod
+    def name_filter(terms, vendor):
+        if vendor == 'sqlite':
+            indexed = [term for term in terms if len(term) >= FTS_MIN_TERM]
+            conditions = [Q(first_name__icontains=term) | Q(last_name__icontains=term) for term in terms if len(term) < FTS_MIN_TERM]
+            if indexed:
+                match = ' AND '.join('"%s"' % term.replace('"', '""') for term in indexed)
+                conditions.append(Q(pk__in=RawSQL('SELECT rowid FROM core_customer_fts WHERE core_customer_fts MATCH %s', [match])))
+            return reduce(operator.and_, conditions)
+        # On PostgreSQL these are UPPER(col::text) LIKE, which the trigram indexes serve
+        return reduce(operator.and_, (Q(first_name__icontains=term) | Q(last_name__icontains=term) for term in terms))
+
+    @staticmethod
+    def name_rank(term):
+        return Case(
+            When(Q(first_name__iexact=term) | Q(last_name__iexact=term), then=Value(3)),
+            When(Q(first_name__istartswith=term) | Q(last_name__istartswith=term), then=Value(2)),
+            default=Value(1),
+        )
@@ -6,7 +6,7 @@ import re
 class CustomerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Customer
-        fields = '__all__'
+        exclude = ['phone_digits']
 
 class CreditApplicationSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.signals import request_finished
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import forget_tokens
+from .counters import adjust_loan_counter, refresh_scheduled_dashboard
+from .credit_profile import record_new_loan, refresh_credit_profile
+from .loan_versions import bump_loan_versions
+from .metrics import instrument_connection
+from .models import Customer, Loan
+
+
+@receiver(post_save, sender=Loan)
+def update_credit_profile_on_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if created:
+        record_new_loan(instance)
+    elif update_fields is None or set(update_fields) != {'status'}:
+        # Status is not part of the profile; a reassigned loan also leaves its previous customer's profile
+        for customer_pk in {instance.customer_id, getattr(instance, '_loaded_customer_id', None)} - {None}:
+            refresh_credit_profile(customer_pk)
+
+
+@receiver(post_save, sender=Loan)
+def update_status_counters_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None if created else getattr(instance, '_loaded_status', instance.status)
+    if previous != instance.status:
+        adjust_loan_counter(previous, -1)
+        adjust_loan_counter(instance.status, 1)
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=Loan)
+def update_credit_profile_on_delete(sender, instance, origin=None, **kwargs):
+    # The profile is deleted with the customer; don't recreate it mid-cascade
+    if getattr(origin, 'model', type(origin)) is Customer:
+        return
+    refresh_credit_profile(instance.customer_id)
+
+
+@receiver(post_delete, sender=Loan)
+def update_status_counters_on_delete(sender, instance, **kwargs):
+    adjust_loan_counter(getattr(instance, '_loaded_status', instance.status), -1)
+
+
+@receiver(post_save, sender=Loan)
+@receiver(post_delete, sender=Loan)
+def bump_loan_versions_on_loan_change(sender, instance, **kwargs):
+    bump_loan_versions({instance.customer_id, getattr(instance, '_loaded_customer_id', None)})
+    instance._loaded_customer_id = instance.customer_id
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def bump_loan_versions_on_customer_change(sender, instance, **kwargs):
+    bump_loan_versions([instance.pk])
+
+
+@receiver(request_finished)
+def refresh_stale_dashboard(sender, **kwargs):
+    # After the response has gone out, so the request that found the dashboard stale isn't held up
+    refresh_scheduled_dashboard()
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    forget_tokens([instance.key])
+
+
+@receiver(post_save, sender=User)
+def forget_tokens_of_changed_user(sender, instance, update_fields=None, raw=False, **kwargs):
+    # Local token copies carry the user, so deactivation and permission changes must reach them; logins only touch last_login.
+    # Queryset update() sends no post_save: those changes reach the copies when they expire (TOKEN_AUTH_LOCAL_TTL).
+    if raw or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    forget_tokens(Token.objects.filter(user_id=instance.pk).values_list('key', flat=True))
+
+
+if settings.METRICS_ENABLED:
+    connection_created.connect(instrument_connection)
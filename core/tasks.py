@@ -1,8 +1,18 @@
-from celery import shared_task
+from celery import chord, shared_task
+from functools import partial
 import pandas as pd
+import time
 from .models import Customer, Loan
+from .rescoring import rescore_portfolio
+from .amortization import export_active_schedules
+from .counters import reconcile_loan_counters, refresh_dashboard_counts
 from django.db import transaction
 from datetime import datetime
+from .ingestion import (
+    DEFAULT_CHUNK_SIZE, clean_customer_frame, clean_loan_frame, ingest_customers, ingest_loans,
+    ingest_loan_range, ingestion_job_id, load_customer_chunk, load_loan_batch, merge_reports,
+    reconcile_failed_ranges, shard_ranges, stream_ingest,
+)
 
 @shared_task
 def ingest_customer_and_loan_data(customer_file_path, loan_file_path):
@@ -38,4 +48,110 @@ def ingest_customer_and_loan_data(customer_file_path, loan_file_path):
                     'start_date': pd.to_datetime(row.get('Start date', datetime.now())).date() if 'Start date' in row else None,
                     'end_date': pd.to_datetime(row.get('End date', datetime.now())).date() if 'End date' in row else None,
                 }
-            ) 
\ No newline at end of file
+            )
+
+
+@shared_task
+def bulk_ingest_customer_and_loan_data(customer_file_path, loan_file_path, chunk_size=DEFAULT_CHUNK_SIZE, delta=False):
+    """Chunked bulk-upsert variant of ingest_customer_and_loan_data.
+
+    Returns inserted/updated/rejected counts and per-chunk timings for each sheet.
+    With ``delta`` rows whose content fingerprint is unchanged are skipped.
+    """
+    started = time.perf_counter()
+    customers = ingest_customers(pd.read_excel(customer_file_path), chunk_size, delta)
+    loans = ingest_loans(pd.read_excel(loan_file_path), chunk_size, delta=delta)
+    # Bulk upserts bypass the Loan signals
+    reconcile_loan_counters()
+    return {
+        'customers': customers,
+        'loans': loans,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+@shared_task
+def stream_ingest_customer_and_loan_data(customer_file_path, loan_file_path, batch_size=DEFAULT_CHUNK_SIZE, job_id=None, delta=False):
+    """Bounded-memory ingestion of .xlsx, .csv or .ndjson extracts.
+
+    Each batch commits with a checkpoint, so re-running the task with the same
+    files (or ``job_id``) resumes after the last committed batch.
+    """
+    started = time.perf_counter()
+    job_id = job_id or ingestion_job_id(customer_file_path, loan_file_path)
+    load_customers = partial(load_customer_chunk, delta=delta)
+    load_loans = partial(load_loan_batch, delta=delta)
+    customers = stream_ingest(customer_file_path, job_id, 'customers', clean_customer_frame, load_customers, batch_size)
+    loans = stream_ingest(loan_file_path, job_id, 'loans', clean_loan_frame, load_loans, batch_size)
+    reconcile_loan_counters()
+    return {
+        'job_id': job_id,
+        'customers': customers,
+        'loans': loans,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+DEFAULT_SHARD_SIZE = 50000
+
+
+@shared_task
+def ingest_loan_shard(loan_file_path, start, stop, batch_size=DEFAULT_CHUNK_SIZE, delta=False):
+    """Load rows [start, stop) of a loan file; one shard of the parallel pipeline."""
+    report = ingest_loan_range(loan_file_path, start, stop, batch_size, delta)
+    report['shard'] = [start, stop]
+    return report
+
+
+@shared_task
+def merge_loan_shards(shard_reports, loan_file_path, delta=False):
+    """Chord callback: merge shard stats and retry any rows that failed."""
+    report = reconcile_failed_ranges(loan_file_path, merge_reports(shard_reports), delta)
+    reconcile_loan_counters()
+    return report
+
+
+def loan_shard_chord(loan_file_path, shard_size=DEFAULT_SHARD_SIZE, batch_size=DEFAULT_CHUNK_SIZE, delta=False):
+    shards = [
+        ingest_loan_shard.s(loan_file_path, start, stop, batch_size, delta)
+        for start, stop in shard_ranges(loan_file_path, shard_size)
+    ]
+    return chord(shards, merge_loan_shards.s(loan_file_path, delta))
+
+
+@shared_task
+def parallel_ingest_customer_and_loan_data(customer_file_path, loan_file_path, shard_size=DEFAULT_SHARD_SIZE, batch_size=DEFAULT_CHUNK_SIZE, delta=False):
+    """Load customers, then fan the loan file out to the worker pool in row ranges.
+
+    Returns the customer stats and the id of the chord callback, whose result
+    holds the merged loan stats.
+    """
+    job_id = ingestion_job_id(customer_file_path, loan_file_path)
+    load_customers = partial(load_customer_chunk, delta=delta)
+    customers = stream_ingest(customer_file_path, job_id, 'customers', clean_customer_frame, load_customers, batch_size)
+    loans = loan_shard_chord(loan_file_path, shard_size, batch_size, delta).apply_async()
+    return {'job_id': job_id, 'customers': customers, 'loans_result_id': loans.id}
+
+
+@shared_task
+def rescore_all_customers():
+    """Recompute every customer's credit score after a change to CREDIT_SCORE_WEIGHTS."""
+    started = time.perf_counter()
+    rescored = rescore_portfolio()
+    return {'customers': rescored, 'seconds': round(time.perf_counter() - started, 3)}
+
+
+@shared_task
+def export_amortization_schedules(output_path):
+    """Month-end accrual export: schedules of the whole active book as CSV."""
+    started = time.perf_counter()
+    loans = export_active_schedules(output_path)
+    return {'loans': loans, 'path': output_path, 'seconds': round(time.perf_counter() - started, 3)}
+
+
+@shared_task
+def reconcile_dashboard_counters():
+    """Periodic recount of the loan status counters; returns the drift that was corrected."""
+    drift = reconcile_loan_counters()
+    refresh_dashboard_counts()
+    return drift
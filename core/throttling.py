@@ -0,0 +1,120 @@
+"""DRF rate throttles whose counters live in one store shared by every worker process.
+
+Each check is a single atomic GCRA (token bucket) step: Redis runs it as a Lua
+script when ``THROTTLE_REDIS_URL`` is set, otherwise :class:`MemoryThrottleStore`
+runs it in process. A ``n/period`` rate allows a burst of ``n`` requests, then
+one every ``period / n`` seconds.
+"""
+import functools
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+import redis
+from django.conf import settings
+from rest_framework import throttling
+
+logger = logging.getLogger('api')
+
+# Seconds a Redis round trip may take before the request is let through unthrottled
+REDIS_TIMEOUT = 0.25
+MEMORY_STORE_MAX_KEYS = 100_000
+
+# KEYS[1] holds the theoretical arrival time of the next request; ARGV are the interval and period, all in ms.
+# Returns 0 when the request is allowed, else the ms to wait.
+GCRA_SCRIPT = """
+local clock = redis.call('TIME')
+local now = clock[1] * 1000 + clock[2] / 1000
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local tat = math.max(tonumber(redis.call('GET', KEYS[1])) or now, now)
+local excess = tat + interval - now - period
+if excess > 0 then
+    return math.ceil(excess)
+end
+redis.call('SET', KEYS[1], tostring(tat + interval), 'PX', math.ceil(tat + interval - now))
+return 0
+"""
+
+
+class RedisThrottleStore:
+    def __init__(self, url):
+        client = redis.Redis.from_url(url, socket_timeout=REDIS_TIMEOUT, socket_connect_timeout=REDIS_TIMEOUT)
+        self.script = client.register_script(GCRA_SCRIPT)
+
+    def hit(self, key, num_requests, duration):
+        """Count one request against ``key``; returns 0 if allowed, else the seconds to wait."""
+        try:
+            wait_ms = self.script(keys=[key], args=[duration * 1000 / num_requests, duration * 1000])
+        except redis.RedisError as exc:
+            logger.warning('Throttle store unavailable, not throttling: %s', exc)
+            return 0
+        return wait_ms / 1000
+
+
+class MemoryThrottleStore:
+    """The Redis script's algorithm in process memory, for tests and single-process deployments.
+
+    Keys are kept in least-recently-hit order and the oldest are dropped past
+    ``MEMORY_STORE_MAX_KEYS``, so each hit stays O(1) however many clients there are.
+    """
+
+    def __init__(self, timer=time.time):
+        self.timer = timer
+        self.lock = threading.Lock()
+        self.arrivals = OrderedDict()
+
+    def hit(self, key, num_requests, duration):
+        interval = duration / num_requests
+        with self.lock:
+            now = self.timer()
+            arrival = max(self.arrivals.get(key, now), now) + interval
+            if arrival - now > duration:
+                self.arrivals.move_to_end(key)
+                return math.ceil((arrival - now - duration) * 1000) / 1000
+            self.arrivals[key] = arrival
+            self.arrivals.move_to_end(key)
+            while len(self.arrivals) > MEMORY_STORE_MAX_KEYS:
+                # Usually long drained; one that wasn't just starts a fresh bucket
+                self.arrivals.popitem(last=False)
+        return 0
+
+
+@functools.lru_cache(maxsize=None)
+def _store(url):
+    return RedisThrottleStore(url) if url else MemoryThrottleStore()
+
+
+def throttle_store():
+    """This process's store for ``THROTTLE_REDIS_URL``."""
+    return _store(settings.THROTTLE_REDIS_URL)
+
+
+class SharedRateThrottle(throttling.SimpleRateThrottle):
+    """Replaces DRF's cache read-modify-write of a request history with one atomic store operation."""
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        self.wait_seconds = throttle_store().hit(self.key, self.num_requests, self.duration)
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class UserRateThrottle(throttling.UserRateThrottle, SharedRateThrottle):
+    pass
+
+
+class AnonRateThrottle(throttling.AnonRateThrottle, SharedRateThrottle):
+    pass
+
+
+class ScopedRateThrottle(throttling.ScopedRateThrottle, SharedRateThrottle):
+    pass
@@ -2,11 +2,19 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     CustomerViewSet, CreditApplicationViewSet, TransactionViewSet, LoanViewSet,
-    RegisterCustomerAPIView, CheckEligibilityAPIView, CreateLoanAPIView, ViewLoanAPIView, ViewLoansByCustomerAPIView,
-    UserRegistrationView, UserLoginView, UserProfileView, AdminUserListView, AdminLoanApprovalView, AdminDashboardView,
+    RegisterCustomerAPIView, CheckEligibilityAPIView, CheckEligibilityBatchAPIView, CreateLoanAPIView, ViewLoanAPIView, ViewLoanScheduleAPIView, ViewLoansByCustomerAPIView,
+    UserRegistrationView, UserLoginView, UserProfileView, AdminUserListView, AdminLoanApprovalView, AdminDashboardView, AdminDatabasePoolView, AdminMetricsView,
     register_ui
 )
 from django.http import JsonResponse
+from django.conf import settings
+
+if settings.ASYNC_READ_VIEWS:
+    # Under ASGI (credit_system.asgi) the read-heavy endpoints are served by their async versions
+    from .async_views import (
+        AsyncCheckEligibilityAPIView as CheckEligibilityAPIView, AsyncUserProfileView as UserProfileView,
+        AsyncViewLoanAPIView as ViewLoanAPIView, AsyncViewLoansByCustomerAPIView as ViewLoansByCustomerAPIView,
+    )
 
 router = DefaultRouter()
 router.register(r'customers', CustomerViewSet)
@@ -27,12 +35,16 @@ def api_v1_root(request):
             "/api/v1/loans/",                   # Loan CRUD
             "/api/v1/register-customer",        # Register customer (custom)
             "/api/v1/check-eligibility",        # Check loan eligibility
+            "/api/v1/check-eligibility/batch",  # Check eligibility for many quotes
             "/api/v1/create-loan",              # Create loan (custom)
             "/api/v1/view-loan/<loan_id>",      # View single loan
+            "/api/v1/view-loan/<loan_id>/schedule", # Amortization schedule of a loan
             "/api/v1/view-loans/<customer_id>", # View loans by customer
             "/api/v1/admin/users/",             # Admin: list users
             "/api/v1/admin/loans/<loan_id>/action/", # Admin: approve/reject loan
             "/api/v1/admin/dashboard/",         # Admin: dashboard
+            "/api/v1/admin/db-pool/",           # Admin: database connection pool metrics
+            "/api/v1/admin/metrics/",           # Admin: Prometheus request and task metrics
         ]
     })
 
@@ -45,10 +57,14 @@ urlpatterns = [
     path('v1/admin/users/', AdminUserListView.as_view(), name='admin-user-list'),
     path('v1/admin/loans/<int:loan_id>/action/', AdminLoanApprovalView.as_view(), name='admin-loan-action'),
     path('v1/admin/dashboard/', AdminDashboardView.as_view(), name='admin-dashboard'),
+    path('v1/admin/db-pool/', AdminDatabasePoolView.as_view(), name='admin-db-pool'),
+    path('v1/admin/metrics/', AdminMetricsView.as_view(), name='admin-metrics'),
     path('v1/', include(router.urls)),
     path('v1/register-customer', RegisterCustomerAPIView.as_view(), name='register-customer'),
     path('v1/check-eligibility', CheckEligibilityAPIView.as_view(), name='check-eligibility'),
+    path('v1/check-eligibility/batch', CheckEligibilityBatchAPIView.as_view(), name='check-eligibility-batch'),
     path('v1/create-loan', CreateLoanAPIView.as_view(), name='create-loan'),
     path('v1/view-loan/<int:loan_id>', ViewLoanAPIView.as_view(), name='view-loan'),
+    path('v1/view-loan/<int:loan_id>/schedule', ViewLoanScheduleAPIView.as_view(), name='view-loan-schedule'),
     path('v1/view-loans/<int:customer_id>', ViewLoansByCustomerAPIView.as_view(), name='view-loans-by-customer'),
 ] 
\ No newline at end of file
@@ -4,11 +4,29 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from .models import Customer, CreditApplication, Transaction, Loan
+from .counters import dashboard_counts
+from .db_pool import pool_metrics
+from .metrics import collect, prometheus_text
+from .exports import ExportMixin
+from .credit_profile import current_credit_profile, current_credit_profiles
+from .renderers import FastJSONRenderer, NDJSONRenderer, ndjson_line
+from .representation import LeanReadMixin
+from .search import CustomerSearchFilter
+from .throttling import ScopedRateThrottle
+from .scoring import check_eligibility
+from .amortization import amortization_schedule
+from .loan_versions import cached_loan_payload, conditional_response
+from .loans import create_loan
+from .pagination import KeysetPagination
 from .serializers import CustomerSerializer, CreditApplicationSerializer, TransactionSerializer, LoanSerializer, CustomerRegistrationSerializer, LoanEligibilitySerializer, CreateLoanSerializer, UserRegistrationSerializer, UserProfileSerializer
 from django.utils import timezone
-from datetime import datetime
-import math
-from django.http import HttpResponse
+from datetime import datetime, timezone as dt_timezone
+from django.db.models import F, Value
+from django.db.models.functions import ExtractMonth, ExtractYear, Greatest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import filters
 from django_filters.rest_framework import DjangoFilterBackend
@@ -17,6 +35,7 @@ from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
 from rest_framework.permissions import IsAdminUser
 import logging
+import os
 from django.views.decorators.csrf import csrf_exempt
 from django.shortcuts import render
 import requests
@@ -25,37 +44,41 @@ logger = logging.getLogger('api')
 
 # Create your views here.
 
-class CustomerViewSet(viewsets.ModelViewSet):
+class CustomerViewSet(ExportMixin, LeanReadMixin, viewsets.ModelViewSet):
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend, CustomerSearchFilter, filters.OrderingFilter]
     filterset_fields = ['age', 'monthly_salary', 'approved_limit']
     search_fields = ['first_name', 'last_name', 'phone_number']
     ordering_fields = ['age', 'monthly_salary', 'approved_limit']
 
-class CreditApplicationViewSet(viewsets.ModelViewSet):
+class CreditApplicationViewSet(LeanReadMixin, viewsets.ModelViewSet):
     queryset = CreditApplication.objects.all()
     serializer_class = CreditApplicationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'amount']
     search_fields = ['status']
     ordering_fields = ['amount', 'submitted_at', 'reviewed_at']
 
-class TransactionViewSet(viewsets.ModelViewSet):
+class TransactionViewSet(ExportMixin, LeanReadMixin, viewsets.ModelViewSet):
     queryset = Transaction.objects.all()
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['amount']
     search_fields = ['amount']
     ordering_fields = ['amount']
 
-class LoanViewSet(viewsets.ModelViewSet):
+class LoanViewSet(ExportMixin, LeanReadMixin, viewsets.ModelViewSet):
     queryset = Loan.objects.all()
     serializer_class = LoanSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['loan_amount', 'interest_rate', 'tenure']
     search_fields = ['loan_amount', 'interest_rate']
@@ -77,109 +100,63 @@ class RegisterCustomerAPIView(APIView):
             return Response(response_data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-# --- Modern Credit Score Logic Helpers ---
-CREDIT_SCORE_WEIGHTS = {
-    'on_time': 40,
-    'num_loans': 15,
-    'current_year': 15,
-    'volume': 20,
-}
-APPROVAL_THRESHOLDS = [
-    (50, 0),    # >50, any interest rate
-    (30, 12),   # 30-50, >12%
-    (10, 16),   # 10-30, >16%
-    (0, None),  # <10, not approved
-]
-
-def calculate_credit_score(loans, approved_limit):
-    """Calculate credit score based on loan history."""
-    now = timezone.now().date()
-    current_year = now.year
-    # 1. Past loans paid on time
-    total_emis = sum(l.tenure for l in loans)
-    total_paid_on_time = sum(l.emis_paid_on_time for l in loans)
-    on_time_ratio = (total_paid_on_time / total_emis) if total_emis else 1
-    score_on_time = on_time_ratio * CREDIT_SCORE_WEIGHTS['on_time']
-    # 2. Number of loans taken in past
-    score_num_loans = min(len(loans), 10) / 10 * CREDIT_SCORE_WEIGHTS['num_loans']
-    # 3. Loan activity in current year
-    score_current_year = min(len([l for l in loans if l.start_date.year == current_year]), 5) / 5 * CREDIT_SCORE_WEIGHTS['current_year']
-    # 4. Loan approved volume
-    total_loan_volume = sum(l.loan_amount for l in loans)
-    score_volume = min(total_loan_volume / approved_limit, 1) * CREDIT_SCORE_WEIGHTS['volume'] if approved_limit else 0
-    return score_on_time + score_num_loans + score_current_year + score_volume
-
-def get_approval_and_rate(credit_score, interest_rate):
-    """Determine approval and corrected interest rate based on score."""
-    for threshold, min_rate in APPROVAL_THRESHOLDS:
-        if credit_score > threshold:
-            if min_rate is None:
-                return False, 16  # Not approved, lowest slab
-            if min_rate == 0 or interest_rate > min_rate:
-                return True, interest_rate if interest_rate >= min_rate else min_rate
-            else:
-                return False, min_rate
-    return False, 16
-
-def calculate_emi(principal, rate, tenure):
-    """Calculate EMI using compound interest formula."""
-    r = (rate / 12) / 100
-    n = tenure
-    if r > 0:
-        emi = principal * r * math.pow(1 + r, n) / (math.pow(1 + r, n) - 1)
-    else:
-        emi = principal / n
-    return round(emi, 2)
-
 class CheckEligibilityAPIView(APIView):
+    # Decisions must see the customer's latest loans, so never read from a lagging replica
+    primary_reads = True
+
     def post(self, request):
         data = request.data
         customer_id = data.get('customer_id')
         loan_amount = data.get('loan_amount')
         interest_rate = data.get('interest_rate')
         tenure = data.get('tenure')
-        # Fetch customer and loans
+        # Fetch customer with its maintained loan aggregates
         try:
-            customer = Customer.objects.get(customer_id=customer_id)
+            customer = Customer.objects.select_related('credit_profile').get(customer_id=customer_id)
         except Customer.DoesNotExist:
             return Response({'error': 'Customer not found'}, status=status.HTTP_404_NOT_FOUND)
-        loans = Loan.objects.filter(customer=customer)
-        now = timezone.now().date()
-        # Check if current debt exceeds approved limit
-        current_debt = sum(l.loan_amount for l in loans if l.end_date >= now)
-        if current_debt > (customer.approved_limit or 0):
-            credit_score = 0
-        else:
-            credit_score = calculate_credit_score(loans, customer.approved_limit or 0)
-        # Check if EMIs exceed 50% of salary
-        current_emis = sum(l.monthly_payment for l in loans if l.end_date >= now)
-        new_emi = calculate_emi(loan_amount, interest_rate, tenure)
-        if customer.monthly_salary and (current_emis + new_emi) > 0.5 * customer.monthly_salary:
-            return Response({
-                'customer_id': customer_id,
-                'approval': False,
-                'interest_rate': interest_rate,
-                'corrected_interest_rate': interest_rate,
-                'tenure': tenure,
-                'monthly_installment': new_emi,
-                'reason': 'EMIs exceed 50% of monthly salary'
-            }, status=status.HTTP_200_OK)
-        # Approval logic
-        approval, corrected_interest_rate = get_approval_and_rate(credit_score, interest_rate)
-        corrected_emi = calculate_emi(loan_amount, corrected_interest_rate, tenure)
-        response = {
-            'customer_id': customer_id,
-            'approval': approval,
-            'interest_rate': interest_rate,
-            'corrected_interest_rate': corrected_interest_rate,
-            'tenure': tenure,
-            'monthly_installment': corrected_emi,
-        }
-        if not approval:
-            response['reason'] = 'Loan not approved by policy'
+        profile = current_credit_profile(customer)
+        response = check_eligibility(customer, profile, customer_id, loan_amount, interest_rate, tenure)
         return Response(response, status=status.HTTP_200_OK)
 
+class CheckEligibilityBatchAPIView(APIView):
+    """Eligibility for a list of quotes, with all customers fetched up front.
+
+    Results come back in input order; large batches (or ``?format=ndjson``)
+    are streamed as NDJSON.
+    """
+    renderer_classes = [FastJSONRenderer, NDJSONRenderer]
+    primary_reads = True
+
+    def post(self, request):
+        quotes = request.data.get('quotes') if isinstance(request.data, dict) else request.data
+        if not isinstance(quotes, list) or not quotes:
+            return Response({'error': 'Expected a non-empty list of quotes'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(quotes) > settings.ELIGIBILITY_BATCH_MAX_QUOTES:
+            return Response({'error': f'At most {settings.ELIGIBILITY_BATCH_MAX_QUOTES} quotes per batch'}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = LoanEligibilitySerializer(data=quotes, many=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        quotes = serializer.validated_data
+        customer_ids = {quote['customer_id'] for quote in quotes}
+        customers = Customer.objects.select_related('credit_profile').filter(customer_id__in=customer_ids)
+        customers = {customer.customer_id: customer for customer in current_credit_profiles(list(customers))}
+        results = (self.quote_result(customers.get(quote['customer_id']), quote) for quote in quotes)
+        if request.accepted_renderer.format == 'ndjson' or len(quotes) > settings.ELIGIBILITY_BATCH_STREAM_THRESHOLD:
+            return StreamingHttpResponse((ndjson_line(result) for result in results), content_type=NDJSONRenderer.media_type)
+        return Response(list(results), status=status.HTTP_200_OK)
+
+    def quote_result(self, customer, quote):
+        if customer is None:
+            return {'customer_id': quote['customer_id'], 'error': 'Customer not found'}
+        return check_eligibility(
+            customer, customer.credit_profile, quote['customer_id'],
+            quote['loan_amount'], quote['interest_rate'], quote['tenure'],
+        )
+
 class CreateLoanAPIView(APIView):
+    primary_reads = True
+
     def post(self, request):
         serializer = CreateLoanSerializer(data=request.data)
         if not serializer.is_valid():
@@ -189,22 +166,10 @@ class CreateLoanAPIView(APIView):
         loan_amount = data['loan_amount']
         interest_rate = data['interest_rate']
         tenure = data['tenure']
-        # Fetch customer
-        try:
-            customer = Customer.objects.get(customer_id=customer_id)
-        except Customer.DoesNotExist:
+        loan, eligibility_data = create_loan(customer_id, loan_amount, interest_rate, tenure)
+        if eligibility_data is None:
             return Response({'error': 'Customer not found'}, status=status.HTTP_404_NOT_FOUND)
-        # Check eligibility (reuse logic from CheckEligibilityAPIView)
-        eligibility_request = {
-            'customer_id': customer_id,
-            'loan_amount': loan_amount,
-            'interest_rate': interest_rate,
-            'tenure': tenure,
-        }
-        eligibility_view = CheckEligibilityAPIView()
-        eligibility_response = eligibility_view.post(request._request)
-        eligibility_data = eligibility_response.data
-        if not eligibility_data.get('approval', False):
+        if loan is None:
             return Response({
                 'loan_id': None,
                 'customer_id': customer_id,
@@ -212,24 +177,6 @@ class CreateLoanAPIView(APIView):
                 'message': eligibility_data.get('reason', 'Loan not approved'),
                 'monthly_installment': eligibility_data.get('monthly_installment', 0),
             }, status=status.HTTP_200_OK)
-        # Create loan
-        from datetime import date, timedelta
-        start_date = date.today()
-        end_date = start_date + timedelta(days=30*tenure)
-        loan = Loan.objects.create(
-            customer=customer,
-            loan_id=Loan.objects.count() + 1,
-            loan_amount=loan_amount,
-            tenure=tenure,
-            interest_rate=eligibility_data['corrected_interest_rate'],
-            monthly_payment=eligibility_data['monthly_installment'],
-            emis_paid_on_time=0,
-            start_date=start_date,
-            end_date=end_date,
-        )
-        # Update customer current_debt
-        customer.current_debt = (customer.current_debt or 0) + loan_amount
-        customer.save()
         return Response({
             'loan_id': loan.loan_id,
             'customer_id': customer_id,
@@ -239,51 +186,124 @@ class CreateLoanAPIView(APIView):
         }, status=status.HTTP_201_CREATED)
 
 class ViewLoanAPIView(APIView):
+    # Payloads are cached for every client under the latest stamp, so they're built from the primary
+    primary_reads = True
+
     def get(self, request, loan_id):
-        try:
-            loan = Loan.objects.get(loan_id=loan_id)
-        except Loan.DoesNotExist:
+        entry = cached_loan_payload(
+            self.cache_key(loan_id),
+            lambda: self.owner(loan_id).first(),
+            lambda customer_pk: self.payload(self.row(loan_id, customer_pk).first()),
+        )
+        if entry is None:
             return Response({'error': 'Loan not found'}, status=status.HTTP_404_NOT_FOUND)
-        customer = loan.customer
-        response = {
-            'loan_id': loan.loan_id,
+        return conditional_response(request, entry)
+
+    @staticmethod
+    def cache_key(loan_id):
+        return f'loan-view:{loan_id}'
+
+    @staticmethod
+    def owner(loan_id):
+        return Loan.objects.filter(loan_id=loan_id).values_list('customer_id', flat=True)
+
+    @staticmethod
+    def row(loan_id, customer_pk):
+        return Loan.objects.filter(loan_id=loan_id, customer_id=customer_pk).values(
+            'loan_id', 'loan_amount', 'interest_rate', 'monthly_payment', 'tenure',
+            'customer__customer_id', 'customer__first_name', 'customer__last_name', 'customer__phone_number', 'customer__age',
+        )
+
+    @staticmethod
+    def payload(loan):
+        if loan is None:
+            return None
+        return {
+            'loan_id': loan['loan_id'],
             'customer': {
-                'id': customer.customer_id,
-                'first_name': customer.first_name,
-                'last_name': customer.last_name,
-                'phone_number': customer.phone_number,
-                'age': customer.age,
+                'id': loan['customer__customer_id'],
+                'first_name': loan['customer__first_name'],
+                'last_name': loan['customer__last_name'],
+                'phone_number': loan['customer__phone_number'],
+                'age': loan['customer__age'],
             },
-            'loan_amount': float(loan.loan_amount),
-            'interest_rate': float(loan.interest_rate),
-            'monthly_installment': float(loan.monthly_payment),
-            'tenure': loan.tenure,
+            'loan_amount': float(loan['loan_amount']),
+            'interest_rate': float(loan['interest_rate']),
+            'monthly_installment': float(loan['monthly_payment']),
+            'tenure': loan['tenure'],
         }
+
+class ViewLoanScheduleAPIView(APIView):
+    def get(self, request, loan_id):
+        loan = Loan.objects.filter(loan_id=loan_id).values_list('loan_amount', 'interest_rate', 'tenure', 'monthly_payment').first()
+        if loan is None:
+            return Response({'error': 'Loan not found'}, status=status.HTTP_404_NOT_FOUND)
+        loan_amount, interest_rate, tenure, monthly_payment = float(loan[0]), float(loan[1]), loan[2], float(loan[3])
+        # Keyed on the terms too, so an edited loan never serves a stale schedule
+        cache_key = f'loan-schedule:{loan_id}:{loan_amount}:{interest_rate}:{tenure}:{monthly_payment}'
+        response = cache.get(cache_key)
+        if response is None:
+            response = {
+                'loan_id': loan_id,
+                'loan_amount': loan_amount,
+                'interest_rate': interest_rate,
+                'tenure': tenure,
+                'monthly_installment': monthly_payment,
+                'schedule': amortization_schedule(loan_amount, interest_rate, tenure, monthly_payment),
+            }
+            cache.set(cache_key, response, settings.LOAN_SCHEDULE_CACHE_TIMEOUT)
         return Response(response, status=status.HTTP_200_OK)
 
 class ViewLoansByCustomerAPIView(APIView):
+    # Payloads are cached for every client under the latest stamp, so they're built from the primary
+    primary_reads = True
+
     def get(self, request, customer_id):
-        try:
-            customer = Customer.objects.get(customer_id=customer_id)
-        except Customer.DoesNotExist:
+        now = timezone.now()
+        entry = cached_loan_payload(
+            self.cache_key(customer_id, now),
+            lambda: self.owner(customer_id).first(),
+            lambda customer_pk: self.payload(self.rows(customer_pk, now.date())),
+            valid_from=self.month_start(now),
+        )
+        if entry is None:
             return Response({'error': 'Customer not found'}, status=status.HTTP_404_NOT_FOUND)
-        loans = Loan.objects.filter(customer=customer)
-        now = timezone.now().date()
-        loan_list = []
-        for loan in loans:
-            # Calculate repayments_left
-            total_emis = loan.tenure
-            # Assume EMIs paid on time is up to today
-            months_passed = max(0, (now.year - loan.start_date.year) * 12 + (now.month - loan.start_date.month))
-            repayments_left = max(0, total_emis - months_passed)
-            loan_list.append({
-                'loan_id': loan.loan_id,
-                'loan_amount': float(loan.loan_amount),
-                'interest_rate': float(loan.interest_rate),
-                'monthly_installment': float(loan.monthly_payment),
-                'repayments_left': repayments_left,
-            })
-        return Response(loan_list, status=status.HTTP_200_OK)
+        return conditional_response(request, entry)
+
+    @staticmethod
+    def cache_key(customer_id, now):
+        # repayments_left counts calendar months, so the cached list is per month
+        return f'customer-loans:{customer_id}:{now:%Y%m}'
+
+    @staticmethod
+    def month_start(now):
+        return int(datetime(now.year, now.month, 1, tzinfo=dt_timezone.utc).timestamp())
+
+    @staticmethod
+    def owner(customer_id):
+        return Customer.objects.filter(customer_id=customer_id).values_list('pk', flat=True)
+
+    @staticmethod
+    def rows(customer_pk, today):
+        # EMIs are assumed paid monthly from start_date up to today
+        months_passed = (today.year - ExtractYear('start_date')) * 12 + (today.month - ExtractMonth('start_date'))
+        return Loan.objects.filter(customer_id=customer_pk).values(
+            'loan_id', 'loan_amount', 'interest_rate', 'monthly_payment',
+            repayments_left=Greatest(Value(0), F('tenure') - Greatest(Value(0), months_passed)),
+        )
+
+    @staticmethod
+    def payload(loans):
+        return [
+            {
+                'loan_id': loan['loan_id'],
+                'loan_amount': float(loan['loan_amount']),
+                'interest_rate': float(loan['interest_rate']),
+                'monthly_installment': float(loan['monthly_payment']),
+                'repayments_left': loan['repayments_left'],
+            }
+            for loan in loans
+        ]
 
 class UserRegistrationView(APIView):
     permission_classes = []
@@ -296,6 +316,10 @@ class UserRegistrationView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class UserLoginView(ObtainAuthToken):
+    # ObtainAuthToken turns throttling off; credential guessing gets the strict login rate
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'login'
+
     def post(self, request, *args, **kwargs):
         response = super().post(request, *args, **kwargs)
         token = Token.objects.get(key=response.data['token'])
@@ -309,6 +333,8 @@ class UserProfileView(APIView):
 
 class AdminUserListView(APIView):
     permission_classes = [IsAdminUser]
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'admin'
     def get(self, request):
         users = User.objects.all()
         data = UserProfileSerializer(users, many=True).data
@@ -316,43 +342,48 @@ class AdminUserListView(APIView):
 
 class AdminLoanApprovalView(APIView):
     permission_classes = [IsAdminUser]
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'admin'
     def post(self, request, loan_id):
         action = request.data.get('action')
-        try:
-            loan = Loan.objects.get(loan_id=loan_id)
-        except Loan.DoesNotExist:
-            logger.warning(f'Admin {request.user} tried to access non-existent loan {loan_id}')
-            return Response({'error': 'Loan not found'}, status=status.HTTP_404_NOT_FOUND)
-        if action == 'approve':
-            loan.status = 'approved'
-            loan.save()
-            logger.info(f'Loan {loan_id} approved by admin {request.user}')
-            return Response({'message': 'Loan approved'}, status=status.HTTP_200_OK)
-        elif action == 'reject':
-            loan.status = 'rejected'
-            loan.save()
-            logger.info(f'Loan {loan_id} rejected by admin {request.user}')
-            return Response({'message': 'Loan rejected'}, status=status.HTTP_200_OK)
-        else:
-            logger.warning(f'Admin {request.user} sent invalid action {action} for loan {loan_id}')
-            return Response({'error': 'Invalid action'}, status=status.HTTP_400_BAD_REQUEST)
+        # Locked so two admins acting on one loan move the counters once
+        with transaction.atomic():
+            try:
+                loan = Loan.objects.select_for_update().get(loan_id=loan_id)
+            except Loan.DoesNotExist:
+                logger.warning('Admin %s tried to access non-existent loan %s', request.user, loan_id)
+                return Response({'error': 'Loan not found'}, status=status.HTTP_404_NOT_FOUND)
+            if action not in ('approve', 'reject'):
+                logger.warning('Admin %s sent invalid action %s for loan %s', request.user, action, loan_id)
+                return Response({'error': 'Invalid action'}, status=status.HTTP_400_BAD_REQUEST)
+            loan.status = 'approved' if action == 'approve' else 'rejected'
+            loan.save(update_fields=['status'])
+        logger.info('Loan %s %s by admin %s', loan_id, loan.status, request.user)
+        return Response({'message': f'Loan {loan.status}'}, status=status.HTTP_200_OK)
 
 class AdminDashboardView(APIView):
     permission_classes = [IsAdminUser]
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'admin'
     def get(self, request):
-        total_users = User.objects.count()
-        total_loans = Loan.objects.count()
-        approved_loans = Loan.objects.filter(status='approved').count()
-        pending_loans = Loan.objects.filter(status='pending').count()
-        rejected_loans = Loan.objects.filter(status='rejected').count()
-        logger.info(f'Admin {request.user} viewed dashboard')
-        return Response({
-            'total_users': total_users,
-            'total_loans': total_loans,
-            'approved_loans': approved_loans,
-            'pending_loans': pending_loans,
-            'rejected_loans': rejected_loans,
-        })
+        counts = dashboard_counts()
+        logger.info('Admin %s viewed dashboard', request.user)
+        return Response(counts)
+
+class AdminDatabasePoolView(APIView):
+    permission_classes = [IsAdminUser]
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'admin'
+    def get(self, request):
+        # Pools are per process, so this reports the worker that served the request
+        return Response({'pid': os.getpid(), 'pools': pool_metrics()})
+
+class AdminMetricsView(APIView):
+    permission_classes = [IsAdminUser]
+    # Scraped every few seconds, which the admin rate would soon cut off
+    throttle_classes = []
+    def get(self, request):
+        return HttpResponse(prometheus_text(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 def home(request):
     return HttpResponse("Welcome to the Credit System Home Page!")
@@ -1,8 +1,36 @@
 import os
 from celery import Celery
+from celery.signals import task_postrun, task_prerun
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'credit_system.settings')
 
 app = Celery('credit_system')
 app.config_from_object('django.conf:settings', namespace='CELERY')
-app.autodiscover_tasks() 
\ No newline at end of file
+app.autodiscover_tasks()
+
+
+@task_prerun.connect
+@task_postrun.connect
+def release_db_connections(task=None, **kwargs):
+    """Return each task's connection to the pool (or close it) so the next task's checkout is health-checked."""
+    if task is None or getattr(task.request, 'is_eager', False):
+        # Eager tasks run inside the caller's request and transaction
+        return
+    from django.db import close_old_connections
+    close_old_connections()
+
+
+@task_prerun.connect
+def start_task_metrics(task_id=None, **kwargs):
+    from django.conf import settings
+    if settings.METRICS_ENABLED:
+        from core.metrics import start_task
+        start_task(task_id)
+
+
+@task_postrun.connect
+def record_task_metrics(task_id=None, task=None, state=None, **kwargs):
+    from django.conf import settings
+    if settings.METRICS_ENABLED:
+        from core.metrics import finish_task
+        finish_task(task_id, task.name, state)
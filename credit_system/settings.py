@@ -11,7 +11,10 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import copy
 import os
+import sys
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -39,13 +42,16 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
+    'rest_framework.authtoken',
     'django_filters',
     'core',
     'payment_app',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestIdMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -54,6 +60,14 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per-route request and Celery task timings with SQL counts, summed over every process sharing the cache
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+# Seconds between publishes of each process's counters, and how long a silent process's counters are kept
+METRICS_FLUSH_INTERVAL = 10
+METRICS_SNAPSHOT_TIMEOUT = 24 * 60 * 60
+if METRICS_ENABLED:
+    MIDDLEWARE.insert(1, 'core.middleware.MetricsMiddleware')
+
 ROOT_URLCONF = 'credit_system.urls'
 
 TEMPLATES = [
@@ -79,15 +93,60 @@ WSGI_APPLICATION = 'credit_system.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql_psycopg2',
-        'NAME': 'postgres',
-        'USER': 'user',
-        'PASSWORD': 'Pradeep@8130',
-        'HOST': 'db',
-        'PORT': '5432',
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('DB_NAME', 'postgres'),
+        'USER': os.environ.get('DB_USER', 'user'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', 'Pradeep@8130'),
+        'HOST': os.environ.get('DB_HOST', 'db'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
+        # Pooled connections are checked before each checkout, persistent ones before reuse
+        'CONN_HEALTH_CHECKS': True,
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {},
     }
 }
 
+# Connection pool per process (web workers and Celery worker processes); DB_POOL=0 opens a connection per request instead
+DB_POOL = os.environ.get('DB_POOL', '1') == '1'
+if DB_POOL:
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+        # Seconds a checkout waits for a free connection before failing
+        'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        # Connections are recycled after max_lifetime seconds, and idle ones above min_size closed after max_idle
+        'max_lifetime': float(os.environ.get('DB_POOL_MAX_LIFETIME', 30 * 60)),
+        'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', 5 * 60)),
+    }
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 0))
+
+# Aliases that safe requests read from: those named in DB_REPLICAS, plus one (replica1, ...) per host in
+# DB_REPLICA_HOSTS with the primary's other settings. None keeps every read on the primary. Tests treat them
+# as mirrors of the primary rather than creating test databases on the replica hosts.
+DATABASE_REPLICAS = [alias for alias in os.environ.get('DB_REPLICAS', '').split(',') if alias]
+for number, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1):
+    DATABASES[f'replica{number}'] = {**copy.deepcopy(DATABASES['default']), 'HOST': host, 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+# Set DB_ENGINE=sqlite to run locally (e.g. the test suite) without PostgreSQL.
+if os.environ.get('DB_ENGINE') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        },
+        # Stand-in replica for trying read routing locally (DB_REPLICAS=replica); nothing copies writes into it
+        'replica': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db-replica.sqlite3',
+        },
+    }
+
+DATABASE_ROUTERS = ['core.db_router.PrimaryReplicaRouter']
+# Seconds a client's reads stay on the primary after it sends a write, covering replica lag
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -138,8 +197,13 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
+        'core.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_FILTER_BACKENDS': [
@@ -148,18 +212,70 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ],
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.UserRateThrottle',
-        'rest_framework.throttling.AnonRateThrottle',
+        'core.throttling.UserRateThrottle',
+        'core.throttling.AnonRateThrottle',
     ],
     'DEFAULT_THROTTLE_RATES': {
-        'user': '1000/day',
-        'anon': '100/day',
+        # An empty USER_THROTTLE_RATE / ANON_THROTTLE_RATE disables the throttle (e.g. for load tests)
+        'user': os.environ.get('USER_THROTTLE_RATE', '1000/day') or None,
+        'anon': os.environ.get('ANON_THROTTLE_RATE', '100/day') or None,
         'admin': '5000/day',
         'login': '10/minute',
     },
 }
 
+# Shared Redis cache when REDIS_URL is set, per-process memory cache otherwise
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+
+# Redis shared by every worker for throttle counters (defaults to REDIS_URL); without one each process counts alone
+THROTTLE_REDIS_URL = os.environ.get('THROTTLE_REDIS_URL', os.environ.get('REDIS_URL'))
+
+# API tokens map to their user's id in the shared cache (only with REDIS_URL), and to a per-process copy for TOKEN_AUTH_LOCAL_TTL seconds
+TOKEN_AUTH_CACHE_TIMEOUT = 5 * 60
+TOKEN_AUTH_LOCAL_TTL = 5
+
+LOAN_SCHEDULE_CACHE_TIMEOUT = 60 * 60
+
+# Loan read responses are cached per customer version stamp, only in a shared cache; stamps outlive the entries they validate
+LOAN_VIEW_CACHE_TIMEOUT = 60 * 60
+LOAN_VERSION_TIMEOUT = 24 * 60 * 60
+
+# Batch eligibility: largest accepted batch, and the size above which results are streamed as NDJSON
+ELIGIBILITY_BATCH_MAX_QUOTES = 5000
+ELIGIBILITY_BATCH_STREAM_THRESHOLD = 500
+
+# Route view-loan, view-loans, check-eligibility and profile to their async views under ASGI; off until they measure faster
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS') == '1'
+# Async requests in flight per ASGI worker process; each holds a thread and a database connection
+ASYNC_VIEW_CONCURRENCY = int(os.environ.get('ASYNC_VIEW_CONCURRENCY', 20))
+
+# Rows fetched per server-side cursor round trip (and per streamed chunk) by the export endpoints
+EXPORT_CHUNK_SIZE = 2000
+
+# Loan ids reserved per trip to the id sequence table by each process
+LOAN_ID_BLOCK_SIZE = int(os.environ.get('LOAN_ID_BLOCK_SIZE', 100))
+
+# Admin dashboard counts: served as-is while fresh, then served stale while a worker refreshes them
+DASHBOARD_CACHE_FRESH = 30
+DASHBOARD_CACHE_STALE = 10 * 60
+
 # Logging configuration
+# api.log gets one JSON object per record from every process, written by a background thread; rotate it with
+# logrotate. Setting LOG_MAX_BYTES, or LOG_ROTATE_WHEN (a TimedRotatingFileHandler unit such as 'midnight'), has
+# each process rotate its own api.<pid>.log instead. The test suite logs to a temporary file.
+LOG_FILE = os.environ.get('LOG_FILE', 'api.log')
+if sys.argv[1:2] == ['test']:
+    LOG_FILE = os.path.join(tempfile.gettempdir(), 'credit-system-test-api.log')
+LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', 0))
+LOG_ROTATE_WHEN = os.environ.get('LOG_ROTATE_WHEN') or None
+LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', 5))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -172,6 +288,14 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'core.logs.JsonFormatter',
+        },
+    },
+    'filters': {
+        'request_id': {
+            '()': 'core.logs.RequestIdFilter',
+        },
     },
     'handlers': {
         'console': {
@@ -179,9 +303,13 @@ LOGGING = {
             'formatter': 'verbose',
         },
         'file': {
-            'class': 'logging.FileHandler',
-            'filename': 'api.log',
-            'formatter': 'verbose',
+            'class': 'core.logs.QueueFileHandler',
+            'filename': LOG_FILE,
+            'max_bytes': LOG_MAX_BYTES,
+            'when': LOG_ROTATE_WHEN,
+            'backup_count': LOG_BACKUP_COUNT,
+            'formatter': 'json',
+            'filters': ['request_id'],
         },
     },
     'loggers': {
@@ -198,5 +326,25 @@ LOGGING = {
             'handlers': ['console', 'file'],
             'level': 'INFO',
         },
+        # One record per request, kept out of the console
+        'api.requests': {
+            'handlers': ['file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# Celery
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://redis:6379/0')
+# Chords (parallel ingestion) need a result backend
+CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', 'redis://redis:6379/1')
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER') == '1'
+# Stop Celery's Django fixup from closing the pool after every task; credit_system.celery hands connections back instead
+CELERY_DB_REUSE_MAX = 1000 if DB_POOL else None
+CELERY_BEAT_SCHEDULE = {
+    'reconcile-loan-status-counters': {
+        'task': 'core.tasks.reconcile_dashboard_counters',
+        'schedule': 15 * 60,
     },
 }
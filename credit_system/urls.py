@@ -54,8 +54,10 @@ def api_root(request):
             "/api/v1/loans/",
             "/api/v1/register-customer",
             "/api/v1/check-eligibility",
+            "/api/v1/check-eligibility/batch",
             "/api/v1/create-loan",
             "/api/v1/view-loan/<loan_id>",
+            "/api/v1/view-loan/<loan_id>/schedule",
             "/api/v1/view-loans/<customer_id>"
         ],
         "docs": {